@@ -1,9 +1,9 @@
 from collections import Counter
 
 import nltk
-import transliterate
 
 from site_generator import get_repo_path
+from transliteration import to_russian, from_russian, is_russian, get_stats
 
 
 def get_texts(response):
@@ -63,7 +63,7 @@ def split_languages(texts):
     ru = set()
     eng = set()
     for text in texts:
-        if transliterate.translit(text, 'ru') == text:
+        if is_russian(text):
             ru.add(text)
         else:
             eng.add(text)
@@ -75,11 +75,11 @@ def get_distance(t1, t2):
 
 
 def get_distance_translit(eng, ru):
-    assert transliterate.translit(ru, 'ru') == ru, ru
-    eng_to_ru = transliterate.translit(eng, 'ru')
+    assert is_russian(ru), ru
+    eng_to_ru = to_russian(eng)
     distance1 = nltk.edit_distance(eng_to_ru, ru) / len(min(eng_to_ru, ru))
 
-    ru_to_eng = transliterate.translit(ru, 'ru', reversed=True)
+    ru_to_eng = from_russian(ru)
     distance2 = nltk.edit_distance(eng, ru_to_eng) / len(min(ru_to_eng, eng))
     return min(distance1, distance2)
 
@@ -112,8 +112,8 @@ def contains(a, b):
 def remove_near_duplicates_translit(ru_texts, eng_word, threshold=40):
     filtered = set()
     for ru_word in ru_texts:
-        eng_to_ru = transliterate.translit(eng_word, 'ru')
-        ru_to_eng = transliterate.translit(ru_word, 'ru', reversed=True)
+        eng_to_ru = to_russian(eng_word)
+        ru_to_eng = from_russian(ru_word)
         if min(get_distance(ru_word, eng_to_ru), get_distance(ru_to_eng, eng_word)) <= threshold:
             continue
         elif contains(eng_to_ru, ru_word) or contains(ru_to_eng, eng_word):
@@ -134,7 +134,7 @@ def extract_card_pieces(word, response):
 
 
 def main():
-    from main import CachingProxyTranslator
+    from caching_proxy import CachingProxyTranslator
     from _just_in_case.translation_lingvo import LingvoTranslator
     storage = CachingProxyTranslator(LingvoTranslator.create_instance()).storage
 
@@ -155,6 +155,7 @@ def main():
                 counter['no_translation'] += 1
     print(counter)
     print('avg', counter['total_variants'] / counter['translated'])
+    print(get_stats())
 
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 import pytest
 
-from main import CachingProxyTranslator
+from caching_proxy import CachingProxyTranslator
 from _just_in_case.translation_lingvo import LingvoTranslator
 
 
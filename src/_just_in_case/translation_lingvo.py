@@ -8,23 +8,24 @@ SERVICE_URL = 'https://developers.lingvolive.com/'
 
 class LingvoTranslator:
     @classmethod
-    def create_instance(cls):
+    def create_instance(cls, base_url=SERVICE_URL):
         resp = requests.post(
-            f'{SERVICE_URL}/api/v1.1/authenticate',
+            f'{base_url}/api/v1.1/authenticate',
             headers={
                 'Authorization': f'Basic {LINGVO_API_KEY}',
             }
         )
         print(resp.status_code)
-        return cls(resp.text)
+        return cls(resp.text, base_url=base_url)
 
-    def __init__(self, api_token):
+    def __init__(self, api_token, base_url=SERVICE_URL):
         assert api_token, api_token
         self.api_token = api_token
+        self.base_url = base_url
 
     def __call__(self, word):
         resp = requests.get(
-            f'{SERVICE_URL}/api/v1/Translation?text={word}&srcLang=1033&dstLang=1049&isCaseSensitive=False',
+            f'{self.base_url}/api/v1/Translation?text={word}&srcLang=1033&dstLang=1049&isCaseSensitive=False',
             headers={
                 'Authorization': f'Bearer {self.api_token}',
             }
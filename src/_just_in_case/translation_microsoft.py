@@ -6,18 +6,22 @@ import requests
 from transliterate import translit
 
 from config_gitignored import MICROSOFT_SUBSCRIPTION_KEY
-from entities import DictionaryCard, Translation
+from models import DictionaryCardModel as DictionaryCard, TranslationModel as Translation
 
 MICROSOFT_BASE_PATH = 'https://api.cognitive.microsofttranslator.com'
 
 
 class MicrosoftTranslator:
+    # the dictionary lookup endpoint accepts up to 10 words per request
+    batch_size = 10
+
     @classmethod
-    def create_instance(cls):
-        return cls(MICROSOFT_SUBSCRIPTION_KEY)
+    def create_instance(cls, base_url=MICROSOFT_BASE_PATH):
+        return cls(MICROSOFT_SUBSCRIPTION_KEY, base_url=base_url)
 
-    def __init__(self, api_token):
+    def __init__(self, api_token, base_url=MICROSOFT_BASE_PATH):
         self.api_token = api_token
+        self.base_url = base_url
         self.headers = {
             'Ocp-Apim-Subscription-Key': api_token,
             'Ocp-Apim-Subscription-Region': 'global',
@@ -32,16 +36,20 @@ class MicrosoftTranslator:
     def __call__(self, word):
         return self.translate([word])[word]
 
+    def translate_many(self, words) -> Dict[str, DictionaryCard]:
+        return self.translate(words)
+
     def translate(self, words) -> Dict[str, DictionaryCard]:
         response = requests.post(
-            f'{MICROSOFT_BASE_PATH}/dictionary/lookup?api-version=3.0', params=self.params,
+            f'{self.base_url}/dictionary/lookup?api-version=3.0', params=self.params,
             headers={
                 **self.headers,
                 'X-ClientTraceId': str(uuid.uuid4())
             }, json=[{'text': word} for word in words]
         )
         if not response.ok:
-            raise Exception(f'Failed to translate: {words}')
+            # HTTPError with the response, so RateLimitedTranslator can tell a 429 from other failures
+            raise requests.HTTPError(f'Failed to translate: {words}', response=response)
         response = response.json()
         result = dict()
         if len(response) != len(words):
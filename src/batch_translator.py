@@ -0,0 +1,270 @@
+import time
+import traceback
+from collections import Counter
+
+from caching_proxy import CachingProxyTranslator, translate_in_order
+from card_pool import CardPool, count_card
+from card_writer import CheckpointedCardWriter
+from google import GoogleTranslator, AsyncGoogleTranslator, GoogleResponseParser, CardEnricher, AnkiCardCreator
+from instrumentation import StageMetrics
+from normalization import get_lookup_keys
+from rate_limiter import RateLimitedTranslator, CircuitOpenError
+from translation_cache import ParsedCardCache, get_sqlite_path, TieredCache, NEGATIVE_TTL
+from word_index import WordIndex, get_word_index_path, get_namespaces_path
+
+
+class BatchTranslator:
+    def __init__(self, namespace, cache_name, language, exclude_words_from=(), workers=1, qps=5.0,
+                 prune_responses=False, cache_only=False, enrich=False, stats_json=None, report_interval=30.0,
+                 base_url=None, async_client=False, negative_ttl=NEGATIVE_TTL, memory_budget=64 * 2 ** 20,
+                 normalize=False, lemmatize=False, processes=1, exclude=False):
+        translator_class = AsyncGoogleTranslator if async_client else GoogleTranslator
+        self.metrics = StageMetrics(interval=report_interval)
+        self.translator = CachingProxyTranslator(
+            RateLimitedTranslator(translator_class(dest='en', src=language, base_url=base_url), qps=qps),
+            cache_name=cache_name, prune=GoogleResponseParser.prune if prune_responses else None,
+            cache_only=cache_only, negative_ttl=negative_ttl, memory_budget=memory_budget, metrics=self.metrics
+        )
+        self.parsed_cards = ParsedCardCache(get_sqlite_path(cache_name), parser_version=GoogleResponseParser.VERSION)
+        self.namespace = namespace
+        self.language = language
+        self.exclude_words_from = exclude_words_from
+        # skips words of the namespaces in exclude_words_from, the run then covers sorted distinct words
+        self.exclude = exclude
+        self.workers = workers
+        self.card_creator = GoogleResponseParser()
+        self.enrich = enrich
+        self.normalize = normalize or lemmatize
+        self.lemmatize = lemmatize
+        self.processes = processes
+        self.stats = Counter()
+        self.stats_json = stats_json
+        print(f'namespace={namespace}')
+
+    def _get_path(self, filename, namespace=None):
+        return f'{get_namespaces_path()}/{namespace or self.namespace}/{filename}'
+
+    def _load_words(self, namespace=None):
+        words = set()
+        with open(self._get_path('words.txt', namespace)) as f:
+            for word in f.readlines():
+                words.add(word.strip())
+        words.discard('')
+        return words
+
+    def _load_simple_words(self, namespace=None):
+        words = list()
+        with open(self._get_path('words.txt', namespace)) as f:
+            for word in f.readlines():
+                words.append(word.strip())
+        return words
+
+    def _get_lookup_keys(self, lines):
+        # one key per line, only distinct non-empty keys are looked up, translated and parsed
+        if not self.normalize:
+            return lines
+        keys = get_lookup_keys(lines, self.language if self.lemmatize else None)
+        self.stats['lines'] += len(lines)
+        self.stats['lookup_keys'] += len(set(keys) - {''})
+        return keys
+
+    def _load_with_exclusion(self):
+        words = self._load_words()
+        self.stats['raw_words_before_exclusion'] = len(words)
+        index = WordIndex(get_word_index_path(), get_namespaces_path())
+        try:
+            # only namespaces whose words.txt changed since the last run are read again
+            for namespace, added in index.update_all(self.exclude_words_from).items():
+                self.stats[f'words_from_{namespace}'] = index.count(namespace)
+                self.stats['indexed_words'] += added
+            words -= index.lookup(words, self.exclude_words_from).keys()
+        finally:
+            index.close()
+        self.stats['raw_words_after_exclusion'] = len(words)
+        return sorted(words)
+
+    def _translate(self, word):
+        while True:
+            try:
+                return self.translator(word)
+            except CircuitOpenError as ex:
+                print(f'Translator keeps failing, waiting {ex.retry_after:.0f}s')
+                time.sleep(ex.retry_after)
+            except Exception:
+                traceback.print_exc()
+                return
+
+    def _iter_responses(self, words, cached, fetch=True):
+        if self.translator.cache_only or not fetch:
+            for word in words:
+                yield word, cached.get(word)
+        elif self.workers <= 1:
+            for word in words:
+                # blank lines are never sent to the translator
+                yield word, cached.get(word) if word in cached or not word else self._translate(word)
+        else:
+            # cache hits never reach the pool, responses are yielded in the order of words
+            yield from translate_in_order(self._translate, words, cached, self.workers)
+
+    def _parse(self, word, response):
+        response_hash = self.parsed_cards.get_hash(word, response)
+        if card := self.parsed_cards.get(response_hash):
+            self.stats['parsed_card_cache_hits'] += 1
+            return card
+        with self.metrics.time('parse'):
+            card = self.card_creator.create_card(word, response)
+        self.parsed_cards.put(response_hash, card)
+        return card
+
+    def _create_card(self, word, response):
+        if not response:
+            print(f'skipping: {word}')
+            return
+        card = self._parse(word, response)
+        if self.enrich:
+            with self.metrics.time('enrich'):
+                CardEnricher.enrich(card)
+        with self.metrics.time('anki'):
+            anki_card = AnkiCardCreator.create_card(card)
+        count_card(word, card, anki_card, self.stats)
+        return anki_card
+
+    def _create_anki_cards(self, words, cached, fetch=True):
+        # one item per word, None for words that produced no card
+        if self.processes > 1 and (self.translator.cache_only or not fetch):
+            # all responses are at hand, the parsed card cache is not consulted by the workers
+            pool = CardPool(self.processes, enrich=self.enrich, stats=self.stats, metrics=self.metrics)
+            yield from pool.iter_cards((word, cached.get(word)) for word in words)
+            return
+        for word, response in self._iter_responses(words, cached, fetch):
+            try:
+                yield self._create_card(word, response)
+            except Exception:
+                traceback.print_exc()
+                yield None
+
+    def _partition(self, words):
+        # resolves all words against the cache in one pass, misses are what a run would translate
+        with self.metrics.time('cache_lookup'):
+            cached = self.translator.get_cached_many(words)
+        # repeated and empty lines are neither hits nor misses
+        distinct = [word for word in dict.fromkeys(words) if word]
+        misses = [word for word in distinct if word not in cached]
+        if negative := self.translator.get_negative_many(misses):
+            # known to translate to nothing, _translate answers them without network
+            misses = [word for word in misses if word not in negative]
+        hits = len(distinct) - len(misses)
+        self.stats['negative_cache_hits'] = len(negative)
+        self.stats['cache_hits'] = hits
+        self.stats['cache_misses'] = len(misses)
+        self.metrics.count('cache_hits', hits)
+        self.metrics.count('cache_misses', len(misses))
+        eta = len(misses) / self.translator.delegate.qps
+        print(f'{len(distinct)} words: {hits} cached ({len(negative)} as negative), '
+              f'{len(misses)} to translate, '
+              f'eta {eta / 60:.1f} min at {self.translator.delegate.qps:.1f} qps')
+        return cached, misses
+
+    def _load_and_plan(self):
+        lines = self._load_with_exclusion() if self.exclude else self._load_simple_words()
+        keys = self._get_lookup_keys(lines)
+        words = list(dict.fromkeys(key for key in keys if key)) if self.normalize else keys
+        print(f'Loaded {len(lines)} words: {" ".join(lines[:10])}...')
+        return lines, keys, *self._partition(words)
+
+    def _finish(self):
+        self.translator.close()
+        self.parsed_cards.close()
+        print(self.stats)
+        print(self.translator.delegate.stats)
+        print(self.translator.stats)
+        if isinstance(self.translator.storage, TieredCache):
+            print(f'memory tier: {dict(self.translator.storage.stats)}, {self.translator.storage.size} bytes')
+        print(self.metrics.dump(self.stats_json, self.translator.delegate.stats))
+
+    def plan(self):
+        try:
+            self._load_and_plan()
+        finally:
+            self._finish()
+
+    def prefetch(self):
+        # only fills the cache for misses, a following run is then purely CPU
+        try:
+            lines, keys, cached, misses = self._load_and_plan()
+            for word, response in self._iter_responses(misses, cached):
+                self.stats['prefetched' if response else 'prefetch_failed'] += 1
+                self.metrics.maybe_report(self.translator.delegate.stats)
+        finally:
+            self._finish()
+
+    def _fan_out(self, keys, cached, fetch):
+        # cards of distinct keys, created in order of their first line, are handed to every line with that key
+        cards = self._create_anki_cards(list(dict.fromkeys(key for key in keys if key)), cached, fetch)
+        created = dict()
+        for key in keys:
+            if not key:
+                yield None
+            elif key in created:
+                self.stats['fanned_out'] += 1
+                yield created[key]
+            else:
+                created[key] = next(cards)
+                yield created[key]
+
+    def _write_cards(self, words, cached, restart=False, fetch=True, keys=None):
+        # keys are the lookup keys of words, by default words themselves
+        # a cache-only run leaves misses empty, resuming it with the translator would keep them empty
+        options = dict(
+            enrich=self.enrich, normalize=self.normalize, lemmatize=self.lemmatize,
+            cache_only=self.translator.cache_only, fetch=fetch
+        )
+        writer = CheckpointedCardWriter(self._get_path('anki.cards'), words, options=options)
+        try:
+            if done := writer.open(restart=restart):
+                print(f'Resuming after {done} words')
+            if keys is None:
+                cards = self._create_anki_cards(words[done:], cached, fetch)
+            else:
+                cards = self._fan_out(keys[done:], cached, fetch)
+            for card in cards:
+                with self.metrics.time('write'):
+                    writer.write(card)
+                self.metrics.count('cards' if card else 'empty')
+                self.metrics.maybe_report(self.translator.delegate.stats)
+                if card:
+                    print(f'Created: {card}')
+            writer.commit()
+        finally:
+            writer.close()
+
+    def run(self, restart=False):
+        try:
+            lines, keys, cached, misses = self._load_and_plan()
+            self._write_cards(lines, cached, restart, keys=keys if self.normalize else None)
+        finally:
+            self._finish()
+            print(AnkiCardCreator.pos)
+
+    def run_namespaces(self, namespaces, restart=False):
+        # words shared by several namespaces are translated once, through the same cache and rate limiter
+        try:
+            namespace_words = {namespace: self._load_simple_words(namespace) for namespace in namespaces}
+            namespace_keys = {namespace: self._get_lookup_keys(lines) for namespace, lines in namespace_words.items()}
+            all_keys = (key for keys in namespace_keys.values() for key in keys)
+            words = list(dict.fromkeys(key for key in all_keys if key or not self.normalize))
+            print(f'{len(namespaces)} namespaces, {len(words)} distinct words')
+            cached, misses = self._partition(words)
+            for word, response in self._iter_responses(misses, cached):
+                if response:
+                    cached[word] = response
+                self.metrics.maybe_report(self.translator.delegate.stats)
+            for namespace, words in namespace_words.items():
+                print(f'namespace={namespace}')
+                self.namespace = namespace
+                keys = namespace_keys[namespace] if self.normalize else None
+                self._write_cards(words, cached, restart, fetch=False, keys=keys)
+                self.stats['namespaces'] += 1
+        finally:
+            self._finish()
+            print(AnkiCardCreator.pos)
@@ -0,0 +1,48 @@
+import timeit
+import tracemalloc
+from contextlib import contextmanager
+
+import google
+from benchmarks.samples import load_responses
+from google import GoogleResponseParser, AnkiCardCreator
+from models import DictionaryCardModel, TranslationModel, SynonymModel
+
+
+@contextmanager
+def pydantic_entities():
+    # GoogleResponseParser as it was before entities became dataclasses
+    originals = google.DictionaryCard, google.Translation, google.Synonym
+    google.DictionaryCard, google.Translation, google.Synonym = DictionaryCardModel, TranslationModel, SynonymModel
+    try:
+        yield
+    finally:
+        google.DictionaryCard, google.Translation, google.Synonym = originals
+
+
+def create_cards(responses):
+    cards = [GoogleResponseParser.create_card(word, response) for word, response in responses.items()]
+    return cards, [AnkiCardCreator.create_card(card) for card in cards]
+
+
+def measure(responses):
+    elapsed = min(timeit.repeat(lambda: create_cards(responses), number=1, repeat=5))
+    tracemalloc.start()
+    cards = create_cards(responses)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return 1e6 * elapsed / len(responses), allocated / len(responses), cards[1]
+
+
+def main():
+    responses = load_responses()
+    with pydantic_entities():
+        pydantic_us, pydantic_bytes, pydantic_cards = measure(responses)
+    dataclass_us, dataclass_bytes, dataclass_cards = measure(responses)
+    assert pydantic_cards == dataclass_cards
+    print(f'{len(responses)} responses')
+    print(f'  pydantic: {pydantic_us:7.1f} us, {pydantic_bytes:8.0f} bytes retained per card')
+    print(f'dataclass: {dataclass_us:7.1f} us, {dataclass_bytes:8.0f} bytes retained per card')
+
+
+if __name__ == '__main__':
+    main()
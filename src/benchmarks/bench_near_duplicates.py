@@ -0,0 +1,55 @@
+import random
+import timeit
+
+from benchmarks.samples import load_responses, load_namespace_words
+from google import GoogleResponseParser
+from utils import remove_near_duplicates_within
+
+
+def remove_near_duplicates_within_reference(words):
+    # the original quadratic implementation, kept to check the new one produces identical output
+    result = set(words)
+    for main_word in sorted(words, key=lambda w: (len(w), w)):
+        if main_word not in result:
+            # already removed
+            continue
+        for secondary_word in list(result - {main_word}):
+            if main_word[:-1] in secondary_word:
+                result.remove(secondary_word)
+    return sorted(result, key=lambda word: words.index(word))
+
+
+def get_word_lists(responses):
+    # the lists AnkiCardCreator deduplicates: translations per part of speech and synonyms
+    for word, response in responses.items():
+        card = GoogleResponseParser.create_card(word, response)
+        pos_translations = dict()
+        for translation in card.translations:
+            pos_translations.setdefault(translation.pos, list()).append(translation.word)
+        yield from pos_translations.values()
+        yield [s.word for s in card.synonyms]
+
+
+def measure(func, word_lists, number):
+    return min(timeit.repeat(lambda: [func(words) for words in word_lists], number=number, repeat=5)) / number
+
+
+def main():
+    word_lists = [words for words in get_word_lists(load_responses()) if words]
+    vocabulary = sorted({word for words in word_lists for word in words} | set(load_namespace_words()))
+    rng = random.Random(42)
+    print(f'{len(word_lists)} lists from cached responses, vocabulary of {len(vocabulary)} words')
+    cases = [('cached responses', word_lists, 20)]
+    for size in [10, 50, 200, 1000]:
+        synthetic = [rng.choices(vocabulary, k=size) for _ in range(max(1, 2000 // size))]
+        cases.append((f'{len(synthetic)} lists of {size}', synthetic, 1))
+    for name, lists, number in cases:
+        for words in lists:
+            assert remove_near_duplicates_within(words) == remove_near_duplicates_within_reference(words)
+        old = measure(remove_near_duplicates_within_reference, lists, number)
+        new = measure(remove_near_duplicates_within, lists, number)
+        print(f'{name:>28}: old {1000 * old:9.2f} ms, new {1000 * new:9.2f} ms, x{old / new:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Card creation from cached responses on one process and on CardPool, with the speedup over one process.
+
+    python -m benchmarks.bench_processes --size 5000 --processes 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.samples import load_responses
+from card_pool import CardPool, create_cards
+
+
+def measure(func, repeat=3):
+    timings = list()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speedup of card creation on several processes')
+    parser.add_argument('--size', type=int, default=5000, help='number of cached responses to sample')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--shard-size', type=int, default=100)
+    parser.add_argument('--enrich', action='store_true')
+    args = parser.parse_args()
+    responses = load_responses(size=args.size)
+    items = list(responses.items())
+    # the fallback sample is tiny, repeated so that shards are worth shipping
+    items = items * max(1, args.size // len(items))
+    print(f'{len(items)} responses, {os.cpu_count()} cores')
+    serial = measure(lambda: create_cards(items, args.enrich))
+    print(f'   serial: {serial:7.3f} s')
+    for processes in args.processes:
+        pool = CardPool(processes, enrich=args.enrich, shard_size=args.shard_size)
+        elapsed = measure(lambda: list(pool.iter_cards(items)))
+        print(f'{processes:3} procs: {elapsed:7.3f} s, x{serial / elapsed:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import copy
+import random
+import timeit
+
+import nltk
+import transliterate
+
+from benchmarks.samples import load_responses, load_namespace_words
+from entities import DictionaryCard, Synonym
+from google import GoogleResponseParser, CardEnricher
+from utils import contains
+
+
+def get_near_duplicates_reference(synonyms, word, threshold=40):
+    # the original nltk based implementations CardEnricher.enrich used
+    for synonym in synonyms:
+        distance = 100 * nltk.edit_distance(synonym, word) / max(min(len(synonym), len(word)), 1)
+        if distance <= threshold or contains(synonym, word):
+            yield word
+
+
+def get_near_duplicates_translit_reference(ru_words, eng_word, threshold=40):
+    def get_distance(t1, t2):
+        return 100 * nltk.edit_distance(t1, t2) / max(min(len(t1), len(t2)), 1)
+
+    eng_to_ru = transliterate.translit(eng_word, 'ru')
+    for ru_word in ru_words:
+        ru_to_eng = transliterate.translit(ru_word, 'ru', reversed=True)
+        if min(get_distance(ru_word, eng_to_ru), get_distance(ru_to_eng, eng_word)) <= threshold:
+            yield ru_word
+        elif contains(eng_to_ru, ru_word) or contains(ru_to_eng, eng_word):
+            yield ru_word
+
+
+def enrich_reference(card):
+    card.too_similar.update(get_near_duplicates_reference({s.word for s in card.synonyms}, card.word))
+    card.too_similar.update(get_near_duplicates_translit_reference(
+        ru_words=[t.word for t in card.translations], eng_word=card.word
+    ))
+
+
+def get_cards():
+    cards = [GoogleResponseParser.create_card(word, response) for word, response in load_responses().items()]
+    # namespace words with random namespace words as synonyms, most of them differ a lot in length
+    vocabulary = load_namespace_words()
+    rng = random.Random(42)
+    for word in rng.sample(vocabulary, min(300, len(vocabulary))):
+        synonyms = [Synonym(word=synonym, pos='') for synonym in rng.sample(vocabulary, 10)]
+        cards.append(DictionaryCard(word=word, synonyms=synonyms))
+    return cards
+
+
+def main():
+    cards = get_cards()
+    for card in cards:
+        expected, actual = copy.deepcopy(card), copy.deepcopy(card)
+        enrich_reference(expected)
+        CardEnricher.enrich(actual)
+        assert expected.too_similar == actual.too_similar, card.word
+    for name, enrich in [('nltk', enrich_reference), ('similarity', CardEnricher.enrich)]:
+        copies = [copy.deepcopy(card) for card in cards]
+        elapsed = min(timeit.repeat(lambda: [enrich(card) for card in copies], number=1, repeat=5))
+        print(f'{name:>12}: {1e6 * elapsed / len(cards):8.1f} us per card')
+
+
+if __name__ == '__main__':
+    main()
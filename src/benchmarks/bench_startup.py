@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = [
+    'main',
+    # what main imports, main itself needs config_gitignored
+    'google',
+    'translation_cache',
+    'fcon.fcon_new',
+    'cbgen',
+    'clipboard_helper',
+    'verbs.inplace',
+]
+
+
+def parse_importtime(stderr):
+    # lines look like: "import time:      2177 |     163530 |   utils"
+    modules = list()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # nesting is kept as two spaces per level
+        modules.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return modules
+
+
+def run_importtime(statement):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_PATH, os.path.dirname(SRC_PATH)]))
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement], cwd=SRC_PATH, env=env, capture_output=True, text=True
+    )
+
+
+def measure(module, top=5):
+    # modules the interpreter imports before running anything (site, encodings, .pth files) are not counted
+    startup = {name for _, _, name in parse_importtime(run_importtime('pass').stderr)}
+    completed = run_importtime(f'import {module}')
+    modules = [m for m in parse_importtime(completed.stderr) if m[2] not in startup]
+    failure = None
+    if completed.returncode:
+        failure = completed.stderr.strip().splitlines()[-1]
+    # when the import fails half way there is no line for the entry point, count what got imported
+    total_us = next((m[0] for m in modules if m[2] == module), None)
+    if total_us is None:
+        total_us = sum(m[0] for m in modules if not m[2].startswith(' '))
+    heaviest = sorted((m for m in modules if m[2] != module), reverse=True)[:top]
+    return total_us, heaviest, failure
+
+
+def main():
+    for module in ENTRY_POINTS:
+        total_us, heaviest, failure = measure(module)
+        print(f'{module}: {total_us / 1000:.1f} ms' + (f' (failed: {failure})' if failure else ''))
+        for cumulative_us, _, name in heaviest:
+            print(f'    {cumulative_us / 1000:8.1f} ms {name.strip()}')
+
+
+if __name__ == '__main__':
+    main()
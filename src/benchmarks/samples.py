@@ -0,0 +1,94 @@
+import dbm
+import os
+import random
+import sqlite3
+
+from translation_cache import decode, get_sqlite_path, get_shelve_path, ShelveCache
+from utils import get_repo_path
+
+# used when no cache is available, e.g. on a fresh checkout
+FALLBACK_RESPONSES = {
+    'menina': [
+        [['девочка', 'menina', None, None, 10], [None, None, 'devochka']], None, 'pt', None, None,
+        [['menina', None, [['девочка', 0, True, False, [10]], ['девушка', 0, True, False, [11]]], [[0, 6]], 'menina',
+          0, 0]], 1, [], [['pt'], None, [1], ['pt']], None, None,
+        [['имя существительное', [
+            [['garota', 'moça', 'mulher', 'brasa', 'rapariga'], ''],
+            [['garota', 'mulher', 'namorada', 'amante', 'rapariga'], ''],
+            [['devassa', 'prostituta', 'mulher da vida', 'puta', 'rapariga'], ''],
+            [['senhorita', 'garota', 'moça', 'rapariga'], '']], 'menina']], None, None, [['menino']]
+    ],
+    'allusions': [
+        [['намёки', 'allusions', None, None, 3, None, None, [[]],
+          [[['cce7c67b3f2439089dd6b428e0b83b88', 'en_ru_2020q2.md']]]], [None, None, 'namoki']], None, 'en', None,
+        None, [['allusions', None, [['намёки', 0, True, False, [3]], ['аллюзии', 0, True, False, [8]]], [[0, 9]],
+                'allusions', 0, 0]], 0.7109375, [], [['en'], None, [0.7109375], ['en']], None, None, None, None, None,
+        [['allusion']]
+    ],
+}
+
+
+def _read_sqlite(cache_name):
+    path = get_sqlite_path(cache_name)
+    if not os.path.exists(path):
+        return dict()
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute('SELECT word, codec, response FROM translations').fetchall()
+    return _load_entries(path, ((word, (codec, blob)) for word, codec, blob in rows), lambda row: decode(*row))
+
+
+def _read_shelve(cache_name):
+    path = get_shelve_path(cache_name)
+    if not dbm.whichdb(path):
+        return dict()
+    storage = ShelveCache(path, flag='r')
+    try:
+        return _load_entries(path, ((word, word) for word in storage.keys()), storage.get)
+    finally:
+        storage.close()
+
+
+def _load_entries(path, entries, load):
+    # pickles of classes that moved since, e.g. projects.ankigen.entities, are skipped instead of failing the load
+    responses, skipped = dict(), 0
+    for word, stored in entries:
+        try:
+            responses[word] = load(stored)
+        except Exception:
+            skipped += 1
+    if skipped:
+        print(f'Skipped {skipped} entries of {path} that failed to load')
+    return responses
+
+
+def load_cache(cache_name):
+    """Every cached response of data/dictionaries/{cache_name}, shelve and SQLite, {word: response}"""
+    responses = _read_shelve(cache_name)
+    responses.update(_read_sqlite(cache_name))
+    return responses
+
+
+def load_responses(cache_names=('googletranslator', 'portuguese', 'pt_to_en'), size=500, seed=42):
+    """A reproducible sample of cached Google responses, {word: response}"""
+    responses = dict()
+    for cache_name in cache_names:
+        responses.update(load_cache(cache_name))
+    responses = {word: response for word, response in responses.items() if isinstance(response, list) and response}
+    if not responses:
+        print('No cached responses found, using fallback responses')
+        return dict(FALLBACK_RESPONSES)
+    words = sorted(responses)
+    words = random.Random(seed).sample(words, min(size, len(words)))
+    return {word: responses[word] for word in words}
+
+
+def load_namespace_words():
+    namespaces_path = f'{get_repo_path()}/data/namespaces'
+    words = set()
+    for namespace in sorted(os.listdir(namespaces_path)):
+        path = f'{namespaces_path}/{namespace}/words.txt'
+        if os.path.exists(path):
+            with open(path) as f:
+                words.update(line.strip() for line in f)
+    words.discard('')
+    return sorted(words)
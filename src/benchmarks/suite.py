@@ -0,0 +1,139 @@
+"""
+Offline regression benchmarks over a reproducible sample of cached Google responses.
+
+    python -m benchmarks.suite            # compares against benchmarks/baselines.json
+    python -m benchmarks.suite --update   # stores the current numbers as the new baselines
+
+Baselines are per machine and per response sample, re-run with --update after switching either.
+Numbers of the fallback sample, used when data/dictionaries has no readable cache, are never stored.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_near_duplicates import get_word_lists
+from benchmarks.samples import load_responses, FALLBACK_RESPONSES
+from card_writer import CheckpointedCardWriter
+from google import GoogleResponseParser, CardEnricher, AnkiCardCreator
+from utils import remove_near_duplicates_within
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+REPEAT = 7
+
+
+def measure(func, setup=lambda: None, repeat=REPEAT, min_time=0.05):
+    # best of `repeat` averages over enough calls to take min_time, setup is excluded from the timing,
+    # e.g. fresh copies of cards for enrich
+    def run_once():
+        args = setup()
+        started = time.perf_counter()
+        func(args)
+        return time.perf_counter() - started
+
+    number = max(1, int(min_time / max(run_once(), 1e-9)))
+    return min(sum(run_once() for _ in range(number)) / number for _ in range(repeat))
+
+
+def parse(responses):
+    return [GoogleResponseParser.create_card(word, response) for word, response in responses.items()]
+
+
+def regenerate(responses, cards_path):
+    # what BatchTranslator.run does for a fully cached namespace, without its config and caches
+    words = list(responses)
+    writer = CheckpointedCardWriter(cards_path, words)
+    writer.open(restart=True)
+    try:
+        for word in words:
+            card = GoogleResponseParser.create_card(word, responses[word])
+            CardEnricher.enrich(card)
+            writer.write(AnkiCardCreator.create_card(card))
+        writer.commit()
+    finally:
+        writer.close()
+
+
+def run_cases(responses):
+    # us per item for every case
+    cards = parse(responses)
+    word_lists = [words for words in get_word_lists(responses) if words]
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_path:
+        cases = [
+            ('parse', len(responses), lambda _: parse(responses), lambda: None),
+            ('enrich', len(cards), lambda copies: [CardEnricher.enrich(card) for card in copies],
+             lambda: copy.deepcopy(cards)),
+            ('anki', len(cards), lambda _: [AnkiCardCreator.create_card(card) for card in cards], lambda: None),
+            ('dedup', len(word_lists), lambda _: [remove_near_duplicates_within(words) for words in word_lists],
+             lambda: None),
+            ('regenerate', len(responses), lambda _: regenerate(responses, f'{tmp_path}/anki.cards'), lambda: None),
+        ]
+        for name, count, func, setup in cases:
+            results[name] = round(1e6 * measure(func, setup) / max(count, 1), 2)
+    return results
+
+
+def get_sample_id(responses):
+    return hashlib.sha1('\n'.join(responses).encode()).hexdigest()[:12]
+
+
+def compare(results, baselines, tolerance):
+    regressions = list()
+    for name, us in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f'{name:>12}: {us:10.2f} us, no baseline')
+            continue
+        ratio = us / baseline
+        regressed = ratio > 1 + tolerance
+        print(f'{name:>12}: {us:10.2f} us, baseline {baseline:10.2f} us, x{ratio:.2f}'
+              + ('  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks of card generation')
+    parser.add_argument('--update', action='store_true', help='store the current numbers as baselines')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed relative slowdown before failing, timings of a busy machine vary a lot')
+    parser.add_argument('--size', type=int, default=500, help='number of cached responses to sample')
+    args = parser.parse_args()
+    responses = load_responses(size=args.size)
+    sample_id = get_sample_id(responses)
+    print(f'{len(responses)} responses, sample {sample_id}')
+    results = run_cases(responses)
+    if responses == FALLBACK_RESPONSES:
+        # two responses say nothing about real cards, neither as a baseline nor compared to one
+        for name, us in results.items():
+            print(f'{name:>12}: {us:10.2f} us')
+        print('Fallback sample, nothing stored nor compared')
+        return
+    if args.update or not os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH, 'w') as f:
+            json.dump(dict(sample=sample_id, responses=len(responses), us_per_item=results), f, indent=4)
+            f.write('\n')
+        for name, us in results.items():
+            print(f'{name:>12}: {us:10.2f} us')
+        print(f'Baselines written to {BASELINES_PATH}')
+        return
+    with open(BASELINES_PATH) as f:
+        baselines = json.load(f)
+    if baselines['sample'] != sample_id:
+        # another sample is not a slowdown, e.g. real cards are much slower to build than the fallback ones
+        print(f'Baselines were measured on sample {baselines["sample"]}, not compared, '
+              f'run with --update to store baselines of this sample')
+        return
+    if regressions := compare(results, baselines['us_per_item'], args.tolerance):
+        print(f'Slower than baseline: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
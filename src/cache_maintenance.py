@@ -0,0 +1,224 @@
+"""
+Maintenance of the translation caches in data/dictionaries, on keys and metadata only: no value is
+decoded except by export.
+
+    python -m cache_maintenance stats portuguese
+    python -m cache_maintenance keys portuguese --src pt
+    python -m cache_maintenance prune portuguese --older-than-days 365 --dry-run
+    python -m cache_maintenance prune portuguese --keep-namespaces '*'
+    python -m cache_maintenance vacuum portuguese
+    python -m cache_maintenance export portuguese --output portuguese.jsonl
+"""
+import argparse
+import dbm
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from normalization import normalize
+from translation_cache import get_sqlite_path, get_shelve_path, decode
+from word_index import WordIndex, get_word_index_path, get_namespaces_path, find_namespaces
+
+SCOPE_COLUMNS = ('translator', 'src', 'dest')
+
+
+def get_scope_filter(translator=None, src=None, dest=None):
+    # a WHERE clause on the given parts of the scope, e.g. every translator of pt -> en
+    conditions, params = list(), list()
+    for column, value in zip(SCOPE_COLUMNS, (translator, src, dest)):
+        if value is not None:
+            conditions.append(f'{column}=?')
+            params.append(value)
+    return ' AND '.join(conditions) or '1', params
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0
+
+
+def get_size_summary(sizes):
+    ordered = sorted(sizes)
+    return dict(
+        entries=len(ordered), bytes=sum(ordered), p50=percentile(ordered, 50), p95=percentile(ordered, 95),
+        max=ordered[-1] if ordered else 0
+    )
+
+
+def get_table_count(connection, table):
+    exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    return connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] if exists else None
+
+
+def get_sqlite_stats(path, **scope):
+    where, params = get_scope_filter(**scope)
+    sizes, codecs, created = dict(), dict(), dict()
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute(
+            f'SELECT translator, src, dest, codec, LENGTH(response), created_at FROM translations WHERE {where}', params
+        )
+        for translator, src, dest, codec, size, created_at in rows:
+            key = f'{translator} {src or "?"}->{dest or "?"}'
+            sizes.setdefault(key, list()).append(size or 0)
+            codecs.setdefault(key, dict()).setdefault(codec, 0)
+            codecs[key][codec] += 1
+            oldest, newest = created.get(key, (created_at, created_at))
+            created[key] = (min(oldest, created_at), max(newest, created_at))
+        tables = ['negative_results', 'poisoned_words', 'parsed_cards']
+        tables = {table: get_table_count(connection, table) for table in tables}
+    return dict(
+        path=path,
+        file_bytes=sum(os.path.getsize(p) for p in [path, f'{path}-wal'] if os.path.exists(p)),
+        scopes={
+            key: dict(
+                **get_size_summary(sizes[key]), codecs=codecs[key],
+                oldest=time.strftime('%Y-%m-%d', time.localtime(created[key][0])),
+                newest=time.strftime('%Y-%m-%d', time.localtime(created[key][1])),
+            )
+            for key in sorted(sizes)
+        },
+        other_tables={table: count for table, count in tables.items() if count is not None},
+    )
+
+
+def get_shelve_stats(path):
+    # sizes of the pickled values as stored, dbm hands out bytes without unpickling them
+    with dbm.open(path, 'r') as db:
+        sizes = [len(db[key]) for key in db.keys()]
+    return dict(path=path, scopes={'shelve': get_size_summary(sizes)})
+
+
+def iter_keys(path, **scope):
+    where, params = get_scope_filter(**scope)
+    with sqlite3.connect(path) as connection:
+        yield from connection.execute(
+            f'SELECT translator, src, dest, word FROM translations WHERE {where} ORDER BY translator, src, dest, word',
+            params
+        )
+
+
+def iter_shelve_keys(path):
+    with dbm.open(path, 'r') as db:
+        for key in db.keys():
+            yield key.decode()
+
+
+def prune(path, older_than_days=None, keep_namespaces=None, dry_run=False, **scope):
+    """
+    Deletes entries created more than older_than_days ago and/or entries of words that are in none of the
+    namespaces matching keep_namespaces. A word is kept both as written in words.txt and normalized, so
+    caches filled with --normalize or --lemmatize keep their keys too.
+    Returns the number of deleted (or, with dry_run, matching) entries.
+    """
+    where, params = get_scope_filter(**scope)
+    conditions = [where]
+    if older_than_days is not None:
+        conditions.append('created_at < ?')
+        params.append(time.time() - older_than_days * 86400)
+    connection = sqlite3.connect(path)
+    try:
+        if keep_namespaces is not None:
+            if not (namespaces := find_namespaces(keep_namespaces)):
+                raise ValueError(f'No namespace matches {keep_namespaces}, that would prune everything')
+            index = WordIndex(get_word_index_path(), get_namespaces_path())
+            try:
+                index.update_all(namespaces)
+            finally:
+                index.close()
+            connection.execute('ATTACH DATABASE ? AS word_index', (get_word_index_path(),))
+            connection.create_function('normalize', 1, normalize, deterministic=True)
+            placeholders = ",".join("?" * len(namespaces))
+            for column in ['word', 'normalize(word)']:
+                conditions.append(
+                    f'word NOT IN (SELECT {column} FROM word_index.words WHERE namespace IN ({placeholders}))'
+                )
+                params.extend(namespaces)
+        condition = ' AND '.join(conditions)
+        if dry_run:
+            return connection.execute(f'SELECT COUNT(*) FROM translations WHERE {condition}', params).fetchone()[0]
+        with connection:
+            return connection.execute(f'DELETE FROM translations WHERE {condition}', params).rowcount
+    finally:
+        connection.close()
+
+
+def vacuum(path):
+    # rewrites the file without free pages, the WAL is checkpointed first so its pages are included
+    before = os.path.getsize(path)
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        connection.execute('VACUUM')
+    finally:
+        connection.close()
+    return before, os.path.getsize(path)
+
+
+def export_jsonl(path, out, **scope):
+    # streams one entry per line, the only command that decodes values
+    where, params = get_scope_filter(**scope)
+    count = 0
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute(
+            f'SELECT translator, src, dest, word, codec, response, created_at FROM translations WHERE {where}', params
+        )
+        for translator, src, dest, word, codec, blob, created_at in rows:
+            entry = dict(translator=translator, src=src, dest=dest, word=word, created_at=created_at,
+                         response=decode(codec, blob))
+            out.write(json.dumps(entry, ensure_ascii=False, default=repr))
+            out.write('\n')
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintenance of the translation caches in data/dictionaries')
+    parser.add_argument('command', choices=['stats', 'keys', 'prune', 'vacuum', 'export'])
+    parser.add_argument('cache_name', help='e.g. portuguese for data/dictionaries/portuguese.sqlite3')
+    parser.add_argument('--translator')
+    parser.add_argument('--src')
+    parser.add_argument('--dest')
+    parser.add_argument('--older-than-days', type=float, help='prune: entries created before this many days ago')
+    parser.add_argument('--keep-namespaces', metavar='GLOB',
+                        help='prune: entries of words in none of the matching namespaces')
+    parser.add_argument('--dry-run', action='store_true', help='prune: only count what would be deleted')
+    parser.add_argument('--output', help='export: path of the JSONL file, stdout by default')
+    args = parser.parse_args()
+    scope = dict(translator=args.translator, src=args.src, dest=args.dest)
+    path = get_sqlite_path(args.cache_name)
+    if not os.path.exists(path):
+        shelve_path = get_shelve_path(args.cache_name)
+        if args.command not in ('stats', 'keys') or not dbm.whichdb(shelve_path):
+            sys.exit(f'{path} does not exist, import the shelve cache with: '
+                     f'python -m translation_cache migrate {args.cache_name} --src SRC --dest DEST')
+        if args.command == 'stats':
+            print(json.dumps(get_shelve_stats(shelve_path), indent=4))
+        else:
+            for word in iter_shelve_keys(shelve_path):
+                print(word)
+        return
+    if args.command == 'stats':
+        print(json.dumps(get_sqlite_stats(path, **scope), indent=4, ensure_ascii=False))
+    elif args.command == 'keys':
+        for row in iter_keys(path, **scope):
+            print('\t'.join(row))
+    elif args.command == 'prune':
+        if args.older_than_days is None and args.keep_namespaces is None:
+            sys.exit('prune needs --older-than-days and/or --keep-namespaces')
+        count = prune(path, args.older_than_days, args.keep_namespaces, args.dry_run, **scope)
+        print(f'{count} entries {"match" if args.dry_run else "deleted"}')
+    elif args.command == 'vacuum':
+        before, after = vacuum(path)
+        print(f'{before} -> {after} bytes')
+    elif args.command == 'export':
+        if args.output:
+            with open(args.output, 'w') as out:
+                count = export_jsonl(path, out, **scope)
+        else:
+            count = export_jsonl(path, sys.stdout, **scope)
+        print(f'Exported {count} entries', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+
+from rate_limiter import get_client_error
+from translation_cache import open_cache, SqliteCache, NegativeCache, TieredCache, NEGATIVE_TTL
+from utils import chunker
+
+
+class CachingProxyTranslator:
+    def __init__(self, delegate, cache_only=False, cache_name=None, backend='sqlite', prune=None,
+                 negative_ttl=NEGATIVE_TTL, poison_after=3, memory_budget=64 * 2 ** 20, metrics=None):
+        self.delegate = delegate
+        translator = self._get_innermost(delegate)
+        # e.g. GoogleTranslator and AsyncGoogleTranslator read and write the same entries
+        translator_name = getattr(translator, 'cache_scope', None) or type(translator).__name__.lower()
+        self.storage = open_cache(
+            cache_name or translator_name, translator=translator_name,
+            src=getattr(translator, 'src', ''), dest=getattr(translator, 'dest', ''), backend=backend, prune=prune
+        )
+        print(f'Cache has {len(self.storage)} entries')
+        self.cache_only = cache_only
+        # words known to translate to nothing, stored next to the responses; shelve has no place for them
+        self.negative = None
+        if isinstance(self.storage, SqliteCache):
+            self.negative = NegativeCache(
+                self.storage.path, *self.storage.scope, ttl=negative_ttl, poison_after=poison_after
+            )
+        if memory_budget:
+            self.storage = TieredCache(self.storage, max_bytes=memory_budget)
+        # words per backend request, e.g. 10 for MicrosoftTranslator, 1 for translators without translate_many
+        self.batch_size = getattr(delegate, 'batch_size', 1)
+        self.stats = Counter()
+        # StageMetrics, only backend requests are timed as 'network', not cache or negative hits
+        self.metrics = metrics
+        # word -> Future of the one backend call concurrent misses of that word wait for
+        self._in_flight = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_innermost(delegate):
+        # e.g. GoogleTranslator wrapped into RateLimitedTranslator
+        while hasattr(delegate, 'delegate'):
+            delegate = delegate.delegate
+        return delegate
+
+    def get_cached(self, word):
+        return self.storage.get(word)
+
+    def get_cached_many(self, words) -> dict:
+        return self.storage.get_many(words)
+
+    def get_negative_many(self, words) -> dict:
+        return self.negative.get_many(words) if self.negative else dict()
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    @staticmethod
+    def get_negative_reason(translation):
+        if not translation:
+            return 'empty'
+        if isinstance(translation, dict) and translation.get('status') == 'failed':
+            # LingvoTranslator reports errors in the response
+            return f'status {translation.get("status_code")}'
+
+    def _is_negative(self, word):
+        if self.negative and self.negative.get(word):
+            self._count('negative_hits')
+            return True
+        return False
+
+    def _put_negative(self, word, reason):
+        self._count('negative_results')
+        if self.negative:
+            self.negative.put(word, reason)
+
+    def _store(self, translations: dict) -> dict:
+        # positive results go to the cache, negative ones to the negative cache and come back as None
+        positive = dict()
+        for word, translation in translations.items():
+            if reason := self.get_negative_reason(translation):
+                self._put_negative(word, reason)
+            else:
+                positive[word] = translation
+        self.storage.put_many(positive.items())
+        if self.negative and positive:
+            # forgets failures of a word that translates now, e.g. after its entry expired
+            self.negative.remove_many(positive)
+        return {word: positive.get(word) for word in translations}
+
+    def _fetch(self, word):
+        return self._fetch_many([word])[word]
+
+    def _fetch_many(self, words, batch=False) -> dict:
+        # one backend request, translate_many of a chunk with batch; a 4xx rejects every word of the request
+        self._count('backend_calls')
+        try:
+            with self.metrics.time('network') if self.metrics else nullcontext():
+                if batch:
+                    translations = self.delegate.translate_many(words)
+                else:
+                    translations = {word: self.delegate(word) for word in words}
+        except Exception as ex:
+            if status_code := get_client_error(ex):
+                for word in words:
+                    self._put_negative(word, f'http {status_code}')
+            raise
+        return self._store(translations)
+
+    def __call__(self, word):
+        # falsy responses are valid cache entries, only None is a miss
+        if (translation := self.get_cached(word)) is not None:
+            return translation
+        elif self.cache_only or self._is_negative(word):
+            return
+        with self._lock:
+            future = self._in_flight.get(word)
+            if is_leader := future is None:
+                future = self._in_flight[word] = Future()
+        if not is_leader:
+            self._count('coalesced')
+            return future.result()
+        try:
+            # the previous leader may have finished between our cache miss and taking the lock
+            if (translation := self.get_cached(word)) is None:
+                translation = self._fetch(word)
+            future.set_result(translation)
+            return translation
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[word]
+
+    def translate_many(self, words) -> dict:
+        # cache misses are sent in chunks of batch_size, every chunk is written to the cache in one go,
+        # words known to translate to nothing come back as None like in __call__
+        result = self.get_cached_many(words)
+        misses = [word for word in dict.fromkeys(words) if word not in result]
+        self._count('batch_cache_hits', len(result))
+        if negative := self.get_negative_many(misses):
+            self._count('negative_hits', len(negative))
+            result.update(dict.fromkeys(negative))
+            misses = [word for word in misses if word not in negative]
+        if self.cache_only or not misses:
+            return result
+        for chunk in chunker(misses, self.batch_size):
+            if self.batch_size > 1:
+                result.update(self._fetch_many(chunk, batch=True))
+            else:
+                result.update((word, self._fetch(word)) for word in chunk)
+            self._count('batched_words', len(chunk))
+        return result
+
+    def close(self):
+        self.storage.close()
+        if self.negative:
+            self.negative.close()
+        if close := getattr(self._get_innermost(self.delegate), 'close', None):
+            close()
+
+
+def _is_resolved(response):
+    return not isinstance(response, Future) or response.done()
+
+
+def _resolve(word, response):
+    if isinstance(response, Future):
+        response = response.result()
+    return word, response
+
+
+def translate_in_order(translate, words, cached, workers):
+    # (word, response) in the order of words, cache hits and blank words never reach the pool,
+    # at most 2 * workers are in flight
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        for word in words:
+            if not word:
+                window.append((word, None))
+            elif word in cached:
+                window.append((word, cached[word]))
+            else:
+                window.append((word, pool.submit(translate, word)))
+            while window and (len(window) > 2 * workers or _is_resolved(window[0][1])):
+                yield _resolve(*window.popleft())
+        while window:
+            yield _resolve(*window.popleft())
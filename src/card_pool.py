@@ -0,0 +1,82 @@
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from google import GoogleResponseParser, CardEnricher, AnkiCardCreator
+from utils import chunker
+
+
+def count_card(word, card, anki_card, stats):
+    # the accounting of a created card, shared by BatchTranslator._create_card and the pool workers
+    if not anki_card:
+        print(f'empty card for: {word}')
+    if len(card.too_similar) > 1:
+        stats['has_too_similar'] += 1
+        stats['too_similar_count'] += len(card.too_similar)
+    if not card.translations:
+        print(f'No translations for: {word}')
+        stats['no_translation_count'] += 1
+    else:
+        stats['success_count'] += 1
+
+
+def create_cards(shard, enrich=False):
+    """
+    Runs in a worker process: anki cards of a shard of (word, pruned response), in order, None where a word
+    produced nothing. Returns them with the stats, per card stage timings and parts of speech seen.
+    """
+    cards, stats, timings = list(), Counter(), dict(parse=list(), enrich=list(), anki=list())
+    for word, response in shard:
+        try:
+            if not response:
+                print(f'skipping: {word}')
+                cards.append(None)
+                continue
+            started = time.perf_counter()
+            card = GoogleResponseParser.create_card(word, response)
+            parsed = time.perf_counter()
+            timings['parse'].append(parsed - started)
+            if enrich:
+                CardEnricher.enrich(card)
+                timings['enrich'].append(time.perf_counter() - parsed)
+            started = time.perf_counter()
+            anki_card = AnkiCardCreator.create_card(card)
+            timings['anki'].append(time.perf_counter() - started)
+            count_card(word, card, anki_card, stats)
+            cards.append(anki_card)
+        except Exception:
+            traceback.print_exc()
+            cards.append(None)
+    return cards, stats, timings, AnkiCardCreator.pos
+
+
+class CardPool:
+    """
+    Creates anki cards from cached responses on several processes. Words are cut into contiguous shards,
+    workers receive only the parts of the responses the parser reads and results come back in shard order,
+    so the cards line up with the words as in a single process run.
+    """
+
+    def __init__(self, processes, enrich=False, shard_size=100, stats=None, metrics=None):
+        self.processes = processes
+        self.enrich = enrich
+        self.shard_size = shard_size
+        self.stats = Counter() if stats is None else stats
+        self.metrics = metrics
+
+    def iter_cards(self, items):
+        # items: (word, response) pairs, yields one anki card or None per pair
+        items = [(word, GoogleResponseParser.prune(response)) for word, response in items]
+        shards = chunker(items, self.shard_size)
+        if not shards:
+            return
+        with ProcessPoolExecutor(max_workers=min(self.processes, len(shards))) as pool:
+            for cards, stats, timings, pos in pool.map(create_cards, shards, repeat(self.enrich)):
+                self.stats.update(stats)
+                for stage, samples in timings.items() if self.metrics else ():
+                    for seconds in samples:
+                        self.metrics.record(stage, seconds)
+                AnkiCardCreator.pos |= pos
+                yield from cards
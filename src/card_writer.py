@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+
+
+class CheckpointedCardWriter:
+    """
+    Appends cards to <path>.partial and records progress in <path>.checkpoint every few words.
+    A rerun over the same words with the same options resumes after the last checkpoint, a run over
+    different words or with options that change the cards, e.g. enrich, starts from scratch.
+    Only a completed run replaces <path>, atomically.
+    """
+
+    def __init__(self, path, words, checkpoint_every=50, options=None):
+        self.path = path
+        self.partial_path = f'{path}.partial'
+        self.checkpoint_path = f'{path}.checkpoint'
+        data = '\n'.join(words) + json.dumps(options or {}, sort_keys=True)
+        self.input_hash = hashlib.sha1(data.encode()).hexdigest()
+        self.checkpoint_every = checkpoint_every
+        self.done = 0
+        self.out = None
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if checkpoint.get('input_hash') == self.input_hash and os.path.exists(self.partial_path):
+            return checkpoint
+
+    def open(self, restart=False) -> int:
+        # returns how many words are already done
+        checkpoint = None if restart else self._read_checkpoint()
+        if checkpoint:
+            self.out = open(self.partial_path, 'r+')
+            self.out.truncate(checkpoint['offset'])
+            self.out.seek(checkpoint['offset'])
+            self.done = checkpoint['done']
+        else:
+            self.out = open(self.partial_path, 'w')
+            self.done = 0
+        return self.done
+
+    def _write_checkpoint(self):
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(input_hash=self.input_hash, done=self.done, offset=self.out.tell()), f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def write(self, card):
+        # called once per input word, card is None for words that produced nothing
+        if card:
+            self.out.write(card + '\n')
+        self.done += 1
+        if self.done % self.checkpoint_every == 0:
+            self._write_checkpoint()
+
+    def commit(self):
+        self.out.close()
+        os.replace(self.partial_path, self.path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def close(self):
+        # keeps .partial and .checkpoint around for the next run to resume from
+        if self.out and not self.out.closed:
+            self._write_checkpoint()
+            self.out.close()
@@ -9,9 +9,6 @@ import clipboard
 
 from langchain.llms import OpenAI
 
-import pyperclip
-from urllib.parse import urlparse
-from langchain.prompts import PromptTemplate
 from config_new import config
 
 from utils import get_repo_path
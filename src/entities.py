@@ -1,28 +1,33 @@
+from dataclasses import dataclass, field
 from typing import List, Set
 
-from pydantic import BaseModel, Field
-
 
 class Word:
     text: str
     frequency: int
 
 
-class Translation(BaseModel):
+# Plain slotted dataclasses: GoogleResponseParser creates one per translation and synonym,
+# validation is left to the pydantic models in models.py at the I/O boundaries.
+
+@dataclass(slots=True)
+class Translation:
     word: str
     confidence: int = None
     pos: str = None
-    back_translations: List[str] = Field(default_factory=list)
+    back_translations: List[str] = field(default_factory=list)
 
 
-class Synonym(BaseModel):
+@dataclass(slots=True)
+class Synonym:
     word: str
     pos: str
 
 
-class DictionaryCard(BaseModel):
+@dataclass(slots=True)
+class DictionaryCard:
     word: str
-    translations: List[Translation] = Field(default_factory=list)
-    synonyms: List[Synonym] = Field(default_factory=list)
-    examples: List[str] = Field(default_factory=list)
-    too_similar: Set[str] = Field(default_factory=set)
+    translations: List[Translation] = field(default_factory=list)
+    synonyms: List[Synonym] = field(default_factory=list)
+    examples: List[str] = field(default_factory=list)
+    too_similar: Set[str] = field(default_factory=set)
@@ -1,28 +1,133 @@
+import threading
 from collections import defaultdict
 
-from googletrans import Translator
-from requests import HTTPError
-
 from entities import DictionaryCard, Translation, Synonym
-from src.utils import get_near_duplicates, get_near_duplicates_translit, remove_near_duplicates_within
+from utils import get_near_duplicates, get_near_duplicates_translit, remove_near_duplicates_within
+
+GOOGLE_BASE_URL = 'https://translate.googleapis.com'
+# what googletrans asks for in its gtx mode, GoogleResponseParser depends on the shape of that response
+GOOGLE_DT = ['at', 'bd', 'ex', 'ld', 'md', 'qca', 'rw', 'rm', 'ss', 't']
 
 
 class GoogleTranslator:
-    def __init__(self, dest='ru', src='en'):
+    # the scope of cached responses, shared by every client returning the same JSON
+    cache_scope = 'googletranslator'
+
+    def __init__(self, dest='ru', src='en', base_url=None):
+        # googletrans pulls in httpx and friends, cache-only and parsing code paths never need it
+        from googletrans import Translator
         self.translator = Translator()
         self.dest = dest
         self.src = src
+        # e.g. the url of mock_server.MockTranslationServer, None for translate.googleapis.com
+        self.base_url = base_url
 
-    def __call__(self, text):
-        assert text, text
+    def _get(self, text):
+        if self.base_url:
+            # the request googletrans sends in its gtx mode, through its own http client
+            from googletrans.utils import build_params
+            params = build_params(
+                client='gtx', query=text, src=self.src, dest=self.dest, token='xxxx', override=None
+            )
+            return self.translator.client.get(f'{self.base_url}/translate_a/single', params=params)
         result = self.translator.translate(text, dest=self.dest, src=self.src)
         # noinspection PyProtectedMember
-        response = result._response
+        return result._response
+
+    def __call__(self, text):
+        assert text, text
+        response = self._get(text)
         if response.is_error:
+            from requests import HTTPError
             raise HTTPError(response.status_code, response)
         return response.json()
 
 
+class AsyncGoogleTranslator:
+    """
+    asyncio client of the endpoint googletrans talks to, returns the same raw JSON as GoogleTranslator.
+    All lookups share one pooled HTTP/2 client. Calling the instance, e.g. from the worker threads of
+    BatchTranslator or through CachingProxyTranslator, runs the lookup on the translator's own event loop,
+    so an instance is used either that way or awaited from a single event loop, not both.
+    """
+
+    cache_scope = GoogleTranslator.cache_scope
+
+    def __init__(self, dest='ru', src='en', base_url=None, max_connections=10, concurrency=20, timeout=10.0):
+        import httpx
+        self.dest = dest
+        self.src = src
+        self.base_url = base_url or GOOGLE_BASE_URL
+        self.concurrency = concurrency
+        self._client_options = dict(
+            http2=True, timeout=timeout,
+            pool_limits=httpx.PoolLimits(max_keepalive=max_connections, max_connections=max_connections),
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'},
+        )
+        self._client = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _get_params(self, text):
+        return dict(
+            client='gtx', sl=self.src, tl=self.dest, hl=self.dest, dt=GOOGLE_DT, ie='UTF-8', oe='UTF-8',
+            otf=1, ssel=0, tsel=0, tk='xxxx', q=text
+        )
+
+    def _get_client(self):
+        # created lazily, an httpx client belongs to the event loop it first runs on
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(**self._client_options)
+        return self._client
+
+    async def translate(self, text):
+        assert text, text
+        response = await self._get_client().get(f'{self.base_url}/translate_a/single', params=self._get_params(text))
+        if response.is_error:
+            from requests import HTTPError
+            raise HTTPError(response.status_code, response)
+        return response.json()
+
+    async def translate_concurrently(self, words) -> dict:
+        import asyncio
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def translate(word):
+            async with semaphore:
+                return word, await self.translate(word)
+
+        return dict(await asyncio.gather(*(translate(word) for word in dict.fromkeys(words))))
+
+    def _get_loop(self):
+        # asyncio takes longer to import than the rest of this module, cache-only runs never need it
+        import asyncio
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coroutine):
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def __call__(self, text):
+        return self.run(self.translate(text))
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self.run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._client = self._thread = None
+
+
 class AnkiCardCreator:
     pos = set()
 
@@ -70,6 +175,21 @@ class AnkiCardCreator:
 
 
 class GoogleResponseParser:
+    # bump whenever create_card changes, cards parsed by older versions are ignored by ParsedCardCache
+    VERSION = 3
+    # the only parts of a response create_card reads, see prune
+    USED_INDEXES = (1, 5, 11, 13)
+
+    @classmethod
+    def prune(cls, response: list) -> list:
+        if not isinstance(response, list):
+            return response
+        pruned = [None] * min(len(response), max(cls.USED_INDEXES) + 1)
+        for index in cls.USED_INDEXES:
+            if index < len(pruned):
+                pruned[index] = response[index]
+        return pruned
+
     @classmethod
     def _get_safely(cls, a_list, index, default=None):
         if len(a_list) > index:
@@ -88,7 +208,8 @@ class GoogleResponseParser:
                 confidence = cls._get_safely(t, index=3, default=1)
                 yield Translation(
                     word=word,
-                    confidence=max((confidence or 0) * 1000, 1),
+                    # an int as the pydantic model coerced it, cards read 'home (4)' and not 'home (4.0)'
+                    confidence=round(max((confidence or 0) * 1000, 1)),
                     back_translations=back_translations or list(),
                     pos=pos
                 )
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    def __init__(self):
+        self.samples = list()
+
+    def add(self, value):
+        self.samples.append(value)
+
+    def percentile(self, p, ordered=None):
+        ordered = ordered or sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        result = dict(count=len(ordered), total_ms=round(1000 * sum(ordered), 3))
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = round(1000 * self.percentile(p, ordered), 3)
+        return result
+
+
+class StageMetrics:
+    """
+    Wall time per stage of BatchTranslator (cache lookup, network, parse, enrich, anki, write).
+    Workers of the translation pool record concurrently, so every update goes through a lock.
+    """
+
+    def __init__(self, interval=30.0, clock=time.perf_counter):
+        self.interval = interval
+        self.clock = clock
+        self.started_at = clock()
+        self.reported_at = self.started_at
+        self.histograms = dict()
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.histograms.setdefault(stage, Histogram()).add(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.record(stage, self.clock() - started)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self, translator_stats=None):
+        elapsed = self.clock() - self.started_at
+        with self._lock:
+            stages = {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+        hits, misses = counters.get('cache_hits', 0), counters.get('cache_misses', 0)
+        network_calls = stages.get('network', {}).get('count', 0)
+        translator_stats = translator_stats or {}
+        return dict(
+            elapsed_s=round(elapsed, 3),
+            cache_hit_rate=round(hits / (hits + misses), 4) if hits + misses else None,
+            requests_per_s=round(network_calls / elapsed, 3) if elapsed else None,
+            throttled_429=translator_stats.get('throttled', 0),
+            counters=counters,
+            stages=stages,
+        )
+
+    def maybe_report(self, translator_stats=None):
+        # one line every `interval` seconds, cheap enough to call per card
+        now = self.clock()
+        if now - self.reported_at < self.interval:
+            return
+        self.reported_at = now
+        summary = self.summary(translator_stats)
+        stages = ' '.join(
+            f'{stage}={values["p50_ms"]:.1f}/{values["p95_ms"]:.1f}/{values["p99_ms"]:.1f}ms'
+            for stage, values in summary['stages'].items()
+        )
+        print(f'[{summary["elapsed_s"]:.0f}s] {summary["counters"].get("cards", 0)} cards, '
+              f'hit rate {summary["cache_hit_rate"]}, {summary["requests_per_s"]} req/s, '
+              f'{summary["throttled_429"]} x 429, p50/p95/p99: {stages}')
+
+    def dump(self, path=None, translator_stats=None):
+        data = json.dumps(self.summary(translator_stats), indent=4)
+        if path:
+            with open(path, 'w') as f:
+                f.write(data)
+        return data
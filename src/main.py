@@ -1,128 +1,65 @@
-import shelve
-import time
-import traceback
-from collections import Counter
-
-from requests import HTTPError
+import argparse
 
 from config_gitignored import NAMESPACE, EXCLUDE_WORDS_FROM, CACHE_NAME, LANGUAGE
-from google import GoogleTranslator, GoogleResponseParser, CardEnricher, AnkiCardCreator
-from utils import get_repo_path
-
-
-class CachingProxyTranslator:
-    def __init__(self, delegate, cache_only=False, cache_name=None):
-        self.delegate = delegate
-        cache_name = cache_name or type(delegate).__name__.lower()
-        self.storage = shelve.open(f'{get_repo_path()}/data/dictionaries/{cache_name}')
-        print(f'Cache has {len(self.storage)} entries')
-        self.cache_only = cache_only
-
-    def __call__(self, word):
-        if translation := self.storage.get(word):
-            return translation
-        elif self.cache_only:
-            return
-        translation = self.delegate(word)
-        self.storage[word] = translation
-        return translation
-
-    def close(self):
-        self.storage.sync()
-        self.storage.close()
-
-
-class BatchTranslator:
-    def __init__(self, namespace):
-        self.translator = CachingProxyTranslator(GoogleTranslator(dest='en', src=LANGUAGE), cache_name=CACHE_NAME)
-        self.namespace = namespace
-        self.card_creator = GoogleResponseParser()
-        self.stats = Counter()
-        print(f'namespace={namespace}')
+from batch_translator import BatchTranslator
+from translation_cache import NEGATIVE_TTL
+from word_index import find_namespaces
 
-    def _get_path(self, filename, namespace=None):
-        return f'{get_repo_path()}/data/namespaces/{namespace or self.namespace}/{filename}'
 
-    def _load_words(self, namespace=None):
-        words = set()
-        with open(self._get_path('words.txt', namespace)) as f:
-            for word in f.readlines():
-                words.add(word.strip())
-        words.discard('')
-        return words
-
-    def _load_simple_words(self, namespace=None):
-        words = list()
-        with open(self._get_path('words.txt', namespace)) as f:
-            for word in f.readlines():
-                words.append(word.strip())
-        return words
-
-    def _load_with_exclusion(self):
-        words = self._load_words()
-        self.stats['raw_words_before_exclusion'] = len(words)
-        for namespace in EXCLUDE_WORDS_FROM:
-            ex = self._load_words(namespace)
-            words -= ex
-            self.stats[f'words_from_{namespace}'] = len(ex)
-        self.stats['raw_words_after_exclusion'] = len(words)
-        return sorted(words)
-
-    def _create_card(self, word):
-        response = self.translator(word)
-        if not response:
-            print(f'skipping: {word}')
-            return
-        card = self.card_creator.create_card(word, response)
-        # CardEnricher.enrich(card)
-        anki_card = AnkiCardCreator.create_card(card)
-        if not anki_card:
-            print(f'empty card for: {word}')
-        if len(card.too_similar) > 1:
-            self.stats['has_too_similar'] += 1
-            self.stats['too_similar_count'] += len(card.too_similar)
-        if not card.translations:
-            print(f'No translations for: {word}')
-            self.stats['no_translation_count'] += 1
-        else:
-            self.stats['success_count'] += 1
-        return anki_card
-
-    def _create_anki_cards(self, words):
-        for word in words:
-            while True:
-                try:
-                    if card := self._create_card(word):
-                        yield card
-                except HTTPError as ex:
-                    if ex.args[0] == 429:
-                        print('Too many requests, sleeping')
-                        time.sleep(60)
-                        continue
-                    traceback.print_exc()
-                except Exception as ex:
-                    if 'Network is unreachable' in str(ex):
-                        print('Network is unreachable')
-                        time.sleep(3)
-                        continue
-                    traceback.print_exc()
-                break
-
-    def run(self):
-        # words = self._load_with_exclusion()
-        words = self._load_simple_words()
-        print(f'Loaded {len(words)} words: {" ".join(words[:10])}...')
-        try:
-            with open(self._get_path('anki.cards'), 'w') as out:
-                for card in self._create_anki_cards(words):
-                    if card:
-                        out.write(card + '\n')
-                        print(f'Created: {card}')
-        finally:
-            self.translator.close()
-            print(self.stats)
-            print(AnkiCardCreator.pos)
+def regenerate_all(pattern='*', **kwargs):
+    # rebuilds anki.cards of every namespace from cached responses only, no network
+    batch_translator = BatchTranslator(None, CACHE_NAME, LANGUAGE, cache_only=True, **kwargs)
+    batch_translator.run_namespaces(find_namespaces(pattern), restart=True)
 
 
 if __name__ == '__main__':
-    BatchTranslator(NAMESPACE).run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'plan', 'prefetch', 'regenerate'])
+    parser.add_argument('--workers', type=int, default=8, help='translations kept in flight, 1 disables the pool')
+    parser.add_argument('--qps', type=float, default=5.0, help='initial request rate, adapted to observed 429s')
+    parser.add_argument('--prune-responses', action='store_true',
+                        help='cache only the parts of responses GoogleResponseParser reads')
+    parser.add_argument('--cache-only', action='store_true', help='never call the translator, skip cache misses')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint of an interrupted run')
+    parser.add_argument('--enrich', action='store_true', help='run CardEnricher on every card')
+    parser.add_argument('--stats-json', metavar='PATH', help='also write the per-stage timing summary to PATH')
+    parser.add_argument('--report-interval', type=float, default=30.0, help='seconds between progress lines')
+    parser.add_argument('--async-client', action='store_true',
+                        help='translate through AsyncGoogleTranslator, one pooled HTTP/2 connection for all workers')
+    parser.add_argument('--negative-ttl-days', type=float, default=NEGATIVE_TTL / 86400,
+                        help='words without translation are not retried for this long')
+    parser.add_argument('--memory-budget-mb', type=float, default=64,
+                        help='size of the in-memory tier of the translation cache, 0 disables it')
+    parser.add_argument('--base-url', help='translate through e.g. a local mock_server.py instead of Google')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='create cards of cached responses on this many processes, cache-only runs and regenerate')
+    parser.add_argument('--normalize', action='store_true',
+                        help='case fold, NFC and strip punctuation of words, translating every distinct result once')
+    parser.add_argument('--lemmatize', action='store_true',
+                        help='--normalize and fold inflected forms into their lemma when it is in words.txt too')
+    parser.add_argument('--exclude', action='store_true',
+                        help='skip words of NAMESPACE that are in the namespaces of EXCLUDE_WORDS_FROM')
+    parser.add_argument('--namespaces', metavar='GLOB',
+                        help='run every namespace of data/namespaces matching GLOB instead of NAMESPACE')
+    args = parser.parse_args()
+    if args.command == 'regenerate':
+        regenerate_all(
+            args.namespaces or '*', workers=args.workers, enrich=args.enrich, stats_json=args.stats_json,
+            report_interval=args.report_interval, normalize=args.normalize, lemmatize=args.lemmatize,
+            processes=args.processes
+        )
+    else:
+        batch_translator = BatchTranslator(
+            NAMESPACE, CACHE_NAME, LANGUAGE, exclude_words_from=EXCLUDE_WORDS_FROM, workers=args.workers, qps=args.qps,
+            prune_responses=args.prune_responses, cache_only=args.cache_only, enrich=args.enrich,
+            stats_json=args.stats_json, report_interval=args.report_interval, base_url=args.base_url,
+            async_client=args.async_client, negative_ttl=args.negative_ttl_days * 86400,
+            memory_budget=int(args.memory_budget_mb * 2 ** 20), normalize=args.normalize, lemmatize=args.lemmatize,
+            processes=args.processes, exclude=args.exclude
+        )
+        if args.command == 'run' and args.namespaces:
+            batch_translator.run_namespaces(find_namespaces(args.namespaces), restart=args.restart)
+        elif args.command == 'run':
+            batch_translator.run(restart=args.restart)
+        else:
+            getattr(batch_translator, args.command)()
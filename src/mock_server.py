@@ -0,0 +1,176 @@
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+GOOGLE_PATH = '/translate_a/single'
+MICROSOFT_PATH = '/dictionary/lookup'
+LINGVO_AUTH_PATH = '/api/v1.1/authenticate'
+LINGVO_PATH = '/api/v1/Translation'
+
+
+def get_google_fallback(word, src, dest):
+    # the shape of a response without dictionary data: a single translation, the word itself
+    return [
+        [[word, word, None, None, 10]], None, src or 'auto', None, None,
+        [[word, None, [[word, 0, True, False, [10]]], [[0, len(word)]], word, 0, 0]]
+    ]
+
+
+def get_microsoft_fallback(word):
+    return dict(normalizedSource=word.lower(), displaySource=word, translations=list())
+
+
+class MockTranslationServer:
+    """
+    Local stand-in for the Google, Microsoft and Lingvo endpoints the translators call.
+    Replays cached responses and injects latency, 429s and 5xx errors, so concurrency, rate limiting
+    and backoff can be exercised without network. Point a translator at it with base_url=server.base_url.
+    """
+
+    def __init__(self, google=None, microsoft=None, lingvo=None, latency=0.0, jitter=0.0, throttle_rate=0.0,
+                 failure_rate=0.0, seed=42, host='127.0.0.1', port=0):
+        self.responses = dict(google=google or dict(), microsoft=microsoft or dict(), lingvo=lingvo or dict())
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._create_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self, 'GET')
+
+            def do_POST(self):
+                server.handle(self, 'POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _draw(self):
+        # one draw per request from a seeded generator, so a sequential client sees the same faults every run
+        with self._lock:
+            return self.random.random(), self.random.uniform(0, self.jitter)
+
+    def handle(self, request, method):
+        url = urlparse(request.path)
+        params = parse_qs(url.query)
+        body = None
+        if method == 'POST':
+            length = int(request.headers.get('Content-Length') or 0)
+            body = request.rfile.read(length) if length else b''
+        draw, jitter = self._draw()
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+        with self._lock:
+            self.stats['requests'] += 1
+        if draw < self.throttle_rate:
+            return self._reply(request, 429, dict(error='Too Many Requests'), stat='throttled')
+        if draw < self.throttle_rate + self.failure_rate:
+            return self._reply(request, 503, dict(error='Service Unavailable'), stat='failed')
+        if url.path == GOOGLE_PATH:
+            word = params.get('q', [''])[0]
+            response = self.responses['google'].get(word)
+            if response is None:
+                response = get_google_fallback(word, params.get('sl', [''])[0], params.get('tl', [''])[0])
+            return self._reply(request, 200, response, stat='google')
+        if url.path == MICROSOFT_PATH and method == 'POST':
+            words = [item['text'] for item in json.loads(body or b'[]')]
+            response = [self.responses['microsoft'].get(word) or get_microsoft_fallback(word) for word in words]
+            return self._reply(request, 200, response, stat='microsoft')
+        if url.path == LINGVO_AUTH_PATH:
+            return self._reply(request, 200, 'mock-token', stat='lingvo_auth', content_type='text/plain')
+        if url.path == LINGVO_PATH:
+            word = params.get('text', [''])[0]
+            if (response := self.responses['lingvo'].get(word)) is not None:
+                return self._reply(request, 200, response, stat='lingvo')
+            return self._reply(request, 404, f'No translations found for text "{word}"', stat='lingvo_missing')
+        self._reply(request, 404, dict(error=f'Unknown endpoint: {url.path}'), stat='unknown')
+
+    def _reply(self, request, status, payload, stat, content_type='application/json'):
+        with self._lock:
+            self.stats[stat] += 1
+        if content_type == 'application/json':
+            payload = json.dumps(payload, ensure_ascii=False)
+        data = payload.encode()
+        request.send_response(status)
+        request.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def get_microsoft_responses(cache):
+    # only entries in the shape of the API, MicrosoftTranslator itself caches parsed DictionaryCardModel instances
+    return {word: response for word, response in cache.items() if isinstance(response, dict)}
+
+
+def main():
+    from benchmarks.samples import load_cache
+    parser = argparse.ArgumentParser(description='Replays cached translator responses over HTTP')
+    parser.add_argument('--google', default='googletranslator', help='cache name of Google responses')
+    parser.add_argument('--microsoft', help='cache name of raw Microsoft lookup responses, none by default')
+    parser.add_argument('--lingvo', default='lingvotranslator', help='cache name of Lingvo responses')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds, up to this value')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of requests answered with 503')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    server = MockTranslationServer(
+        google=load_cache(args.google),
+        microsoft=get_microsoft_responses(load_cache(args.microsoft)) if args.microsoft else None,
+        lingvo=load_cache(args.lingvo), latency=args.latency, jitter=args.jitter,
+        throttle_rate=args.throttle_rate, failure_rate=args.failure_rate, seed=args.seed, port=args.port
+    )
+    print(f'Serving {", ".join(f"{len(r)} {name}" for name, r in server.responses.items())} responses '
+          f'on {server.base_url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(dict(server.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from dataclasses import asdict
+from typing import List, Set
+
+from pydantic import BaseModel, Field
+
+from entities import DictionaryCard, Translation, Synonym
+
+
+class TranslationModel(BaseModel):
+    word: str
+    confidence: int = None
+    pos: str = None
+    back_translations: List[str] = Field(default_factory=list)
+
+
+class SynonymModel(BaseModel):
+    word: str
+    pos: str
+
+
+class DictionaryCardModel(BaseModel):
+    word: str
+    translations: List[TranslationModel] = Field(default_factory=list)
+    synonyms: List[SynonymModel] = Field(default_factory=list)
+    examples: List[str] = Field(default_factory=list)
+    too_similar: Set[str] = Field(default_factory=set)
+
+    @classmethod
+    def from_card(cls, card: DictionaryCard) -> 'DictionaryCardModel':
+        return cls.model_validate(asdict(card))
+
+    def to_card(self) -> DictionaryCard:
+        return DictionaryCard(
+            word=self.word,
+            translations=[Translation(**t.model_dump()) for t in self.translations],
+            synonyms=[Synonym(**s.model_dump()) for s in self.synonyms],
+            examples=list(self.examples),
+            too_similar=set(self.too_similar),
+        )
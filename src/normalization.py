@@ -0,0 +1,50 @@
+import unicodedata
+
+# (suffix, replacement) tried in order, only inflections whose lemma is itself one of the input words are folded
+LEMMA_ENDINGS = dict(
+    en=[('ies', 'y'), ('ied', 'y'), ('es', ''), ('s', ''), ('ed', 'e'), ('ed', ''), ('ing', 'e'), ('ing', '')],
+    pt=[('ões', 'ão'), ('ães', 'ão'), ('ãos', 'ão'), ('ais', 'al'), ('éis', 'el'), ('óis', 'ol'), ('ns', 'm'),
+        ('es', ''), ('s', '')],
+)
+
+
+def is_punctuation(char):
+    return unicodedata.category(char)[0] in 'PS'
+
+
+def normalize(line):
+    # 'Menina,' and ' menina ' look up the same entry, inner hyphens and apostrophes are kept: guarda-chuva, d'água
+    words = unicodedata.normalize('NFC', line).casefold().split()
+    text = ' '.join(words)
+    start, end = 0, len(text)
+    while start < end and is_punctuation(text[start]):
+        start += 1
+    while end > start and is_punctuation(text[end - 1]):
+        end -= 1
+    return text[start:end].strip()
+
+
+def lemmatize(word, language, vocabulary):
+    # a rule based fallback instead of a dictionary: meninas -> menina only when menina is in vocabulary too
+    if ' ' in word:
+        return word
+    for suffix, replacement in LEMMA_ENDINGS[language]:
+        if word.endswith(suffix):
+            lemma = word[:-len(suffix)] + replacement
+            if len(lemma) > 2 and lemma in vocabulary:
+                return lemma
+    return word
+
+
+def get_lookup_keys(lines, language=None) -> list:
+    """
+    One canonical key per line, in order, '' for lines with nothing to translate.
+    With a language, inflected forms are folded into their lemma when the lemma is among the lines.
+    """
+    keys = [normalize(line) for line in lines]
+    if language is None:
+        return keys
+    if language not in LEMMA_ENDINGS:
+        raise ValueError(f'No lemmatization rules for {language}, known: {", ".join(LEMMA_ENDINGS)}')
+    vocabulary = set(keys)
+    return [lemmatize(key, language, vocabulary) if key else key for key in keys]
@@ -0,0 +1,234 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+THROTTLED = 'throttled'
+TRANSIENT = 'transient'
+# Errors of http clients are looked up by name, so none of the clients is imported here:
+# an exception of a library nobody imported cannot occur. googletrans talks through httpx/httpcore.
+TRANSIENT_ERRORS = {
+    'builtins': ['ConnectionError', 'TimeoutError'],
+    'requests': ['ConnectionError', 'Timeout'],
+    'httpx': ['NetworkError', 'TimeoutException'],
+    'httpcore': ['NetworkError', 'TimeoutException'],
+}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Circuit is open, retry in {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+class RetryBudgetExhausted(Exception):
+    pass
+
+
+class ThrottledResponse(Exception):
+    """Raised for translators that report 429 in the response instead of raising, e.g. LingvoTranslator"""
+
+
+def is_instance(ex, module_name, error_names):
+    if module := sys.modules.get(module_name):
+        return any(isinstance(ex, getattr(module, name)) for name in error_names if hasattr(module, name))
+    return False
+
+
+def get_status_code(ex):
+    if is_instance(ex, 'requests', ['HTTPError']):
+        if ex.response is not None and not isinstance(ex.response, int):
+            status_code = getattr(ex.response, 'status_code', None)
+            if status_code:
+                return status_code
+        if ex.args and isinstance(ex.args[0], int):
+            return ex.args[0]
+
+
+def classify(ex):
+    if isinstance(ex, ThrottledResponse):
+        return THROTTLED
+    status_code = get_status_code(ex)
+    if status_code == 429 or 'Too Many Requests' in str(ex):
+        return THROTTLED
+    if status_code and status_code >= 500:
+        return TRANSIENT
+    if 'Network is unreachable' in str(ex):
+        return TRANSIENT
+    for module_name, error_names in TRANSIENT_ERRORS.items():
+        if is_instance(ex, module_name, error_names):
+            return TRANSIENT
+
+
+def get_client_error(ex):
+    # e.g. 404 for a word the service does not know, retrying cannot help, unlike 429
+    status_code = get_status_code(ex)
+    if status_code and 400 <= status_code < 500 and status_code != 429:
+        return status_code
+
+
+def check_response(response):
+    if isinstance(response, dict) and response.get('status') == 'failed' and response.get('status_code') == 429:
+        raise ThrottledResponse(response)
+    return response
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class RetryBudget:
+    # retries are allowed while they stay within `ratio` of successful calls, plus a fixed reserve
+    def __init__(self, ratio=0.2, reserve=20):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.successes = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.successes += 1
+
+    def withdraw(self):
+        with self._lock:
+            if self.retries >= self.reserve + self.ratio * self.successes:
+                return False
+            self.retries += 1
+            return True
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=10, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            retry_after = self.opened_at + self.reset_timeout - self.clock()
+            if retry_after > 0:
+                raise CircuitOpenError(retry_after)
+            # half-open: let calls through, the next failure opens the circuit again
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class RateLimitedTranslator:
+    """
+    Wraps any translator callable (GoogleTranslator, MicrosoftTranslator, LingvoTranslator).
+    The rate grows additively while calls succeed and is halved on every 429 (AIMD),
+    so a long batch settles at the highest rate the service tolerates.
+    """
+
+    def __init__(self, delegate, qps=5.0, min_qps=0.2, max_qps=20.0, max_retries=8,
+                 base_delay=1.0, max_delay=60.0, retry_budget=None, circuit_breaker=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.delegate = delegate
+        self.min_qps = min_qps
+        self.max_qps = max_qps
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.bucket = TokenBucket(qps, clock=clock, sleep=sleep)
+        self.retry_budget = retry_budget or RetryBudget()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(clock=clock)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def qps(self):
+        return self.bucket.rate
+
+    def _set_qps(self, qps):
+        self.bucket.rate = min(self.max_qps, max(self.min_qps, qps))
+
+    def _on_success(self):
+        with self._lock:
+            self.stats['success'] += 1
+            # roughly +0.1 qps per second of successful calls
+            self._set_qps(self.qps + 0.1 / self.qps)
+        self.retry_budget.deposit()
+        self.circuit_breaker.record_success()
+
+    def _on_failure(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+            if kind == THROTTLED:
+                self._set_qps(self.qps / 2)
+        self.circuit_breaker.record_failure()
+
+    def get_delay(self, attempt):
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @property
+    def batch_size(self):
+        return getattr(self.delegate, 'batch_size', 1)
+
+    def __call__(self, word):
+        return self._call(self.delegate, word)
+
+    def translate_many(self, words):
+        # one request for the whole batch, a 429 retries the batch
+        return self._call(self.delegate.translate_many, words)
+
+    def _call(self, func, word):
+        for attempt in range(self.max_retries + 1):
+            self.circuit_breaker.check()
+            self.bucket.acquire()
+            try:
+                result = check_response(func(word))
+            except Exception as ex:
+                kind = classify(ex)
+                if kind is None:
+                    raise
+                self._on_failure(kind)
+                if attempt == self.max_retries:
+                    raise
+                if not self.retry_budget.withdraw():
+                    raise RetryBudgetExhausted(f'No retries left for: {word}') from ex
+                self.stats['retries'] += 1
+                self.sleep(self.get_delay(attempt))
+                continue
+            self._on_success()
+            return result
@@ -0,0 +1,104 @@
+# below this many candidates the per-call overhead of numpy is higher than the pure python loop
+NUMPY_MIN_BATCH = 32
+
+_numpy = None
+
+
+def get_numpy():
+    # numpy is optional and slow to import, it is only needed for large batches
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy
+
+
+def levenshtein(a, b):
+    # same result as nltk.edit_distance(a, b) with its defaults, two rows instead of the full matrix
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Ukkonen's banded Levenshtein: only cells within max_distance of the diagonal are computed
+    and the loop stops as soon as a whole row exceeds max_distance.
+    Returns the distance, or max_distance + 1 when it is larger than max_distance.
+    """
+    if max_distance < 0:
+        return 0 if a == b else max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    too_far = max_distance + 1
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        start = max(1, i - max_distance)
+        end = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        row_min = current[0]
+        for j in range(start, end + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            cost = min(cost, previous[j] + 1, current[j - 1] + 1)
+            current[j] = cost if cost <= max_distance else too_far
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return too_far
+        previous = current
+    return previous[-1]
+
+
+def get_max_distance(a, b, threshold):
+    # utils.get_distance(a, b) <= threshold, expressed as an absolute number of edits
+    return int(threshold * max(min(len(a), len(b)), 1) // 100)
+
+
+def is_near(a, b, threshold=40):
+    max_distance = get_max_distance(a, b, threshold)
+    return bounded_levenshtein(a, b, max_distance) <= max_distance
+
+
+def _levenshtein_many_numpy(word, candidates):
+    # one DP row per letter of word, evaluated for all candidates at once
+    numpy = get_numpy()
+    max_length = max(len(c) for c in candidates)
+    codes = numpy.full((len(candidates), max_length), -1, dtype=numpy.int64)
+    for index, candidate in enumerate(candidates):
+        codes[index, :len(candidate)] = [ord(char) for char in candidate]
+    positions = numpy.arange(max_length + 1)
+    previous = numpy.tile(positions, (len(candidates), 1))
+    for i, char in enumerate(word, 1):
+        current = numpy.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = numpy.minimum(previous[:, 1:] + 1, previous[:, :-1] + (codes != ord(char)))
+        # insertions chain along the row: current[j] = min over k <= j of current[k] + (j - k)
+        current = numpy.minimum.accumulate(current - positions, axis=1) + positions
+        previous = current
+    lengths = numpy.array([len(c) for c in candidates])
+    return previous[numpy.arange(len(candidates)), lengths]
+
+
+def near_many(word, candidates, threshold=40):
+    """[is_near(word, candidate, threshold) for candidate in candidates], vectorized for large batches"""
+    candidates = list(candidates)
+    if len(candidates) < NUMPY_MIN_BATCH or not word or not all(candidates) or not get_numpy():
+        return [is_near(word, candidate, threshold) for candidate in candidates]
+    distances = _levenshtein_many_numpy(word, candidates)
+    return [
+        distance <= get_max_distance(word, candidate, threshold)
+        for distance, candidate in zip(distances.tolist(), candidates)
+    ]
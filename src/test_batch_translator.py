@@ -0,0 +1,94 @@
+import pytest
+
+import batch_translator
+from card_writer import CheckpointedCardWriter
+import translation_cache
+import word_index
+from batch_translator import BatchTranslator
+from benchmarks.samples import FALLBACK_RESPONSES
+from mock_server import MockTranslationServer
+
+
+class TestBatchTranslator:
+    @pytest.fixture
+    def namespaces_path(self, tmp_path, monkeypatch):
+        namespaces_path = tmp_path / 'namespaces'
+        for namespace, words in [('01', 'menina\ncasa\n'), ('02', 'casa\nmenino\nmenina\n')]:
+            (namespaces_path / namespace).mkdir(parents=True)
+            (namespaces_path / namespace / 'words.txt').write_text(words)
+        monkeypatch.setattr(batch_translator, 'get_namespaces_path', lambda: str(namespaces_path))
+        monkeypatch.setattr(translation_cache, 'get_dictionaries_path', lambda: str(tmp_path))
+        monkeypatch.setattr(word_index, 'get_dictionaries_path', lambda: str(tmp_path))
+        return namespaces_path
+
+    @pytest.fixture
+    def server(self):
+        with MockTranslationServer(google=dict(menina=FALLBACK_RESPONSES['menina'])) as server:
+            yield server
+
+    def create(self, server, namespace=None, **kwargs):
+        return BatchTranslator(namespace, 'test', 'pt', base_url=server.base_url, qps=100, **kwargs)
+
+    @staticmethod
+    def read_cards(namespaces_path, namespace):
+        return [line.split('\t')[0] for line in (namespaces_path / namespace / 'anki.cards').read_text().splitlines()]
+
+    def test_run_namespaces_translates_shared_words_once(self, namespaces_path, server):
+        translator = self.create(server, workers=2)
+
+        translator.run_namespaces(['01', '02'])
+
+        assert server.stats['google'] == 3
+        assert translator.translator.stats['backend_calls'] == 3
+        assert self.read_cards(namespaces_path, '01') == ['menina', 'casa']
+        assert self.read_cards(namespaces_path, '02') == ['casa', 'menino', 'menina']
+        assert translator.metrics.summary()['stages']['network']['count'] == 3
+
+    def test_run_namespaces_reuses_the_cache(self, namespaces_path, server):
+        self.create(server).run_namespaces(['01'])
+
+        self.create(server).run_namespaces(['01', '02'])
+
+        assert server.stats['google'] == 3
+        assert self.read_cards(namespaces_path, '02') == ['casa', 'menino', 'menina']
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_blank_lines_are_not_translated(self, namespaces_path, server, workers):
+        (namespaces_path / '01' / 'words.txt').write_text('menina\n\ncasa\n\n')
+        translator = self.create(server, '01', workers=workers)
+
+        translator.run()
+
+        assert server.stats['requests'] == 2
+        assert translator.translator.stats['backend_calls'] == 2
+        assert self.read_cards(namespaces_path, '01') == ['menina', 'casa']
+
+    def test_cache_only_checkpoint_is_not_resumed_with_the_translator(self, namespaces_path, server, monkeypatch):
+        def interrupt(writer):
+            raise KeyboardInterrupt
+
+        with monkeypatch.context() as patch:
+            patch.setattr(CheckpointedCardWriter, 'commit', interrupt)
+            with pytest.raises(KeyboardInterrupt):
+                self.create(server, '01', cache_only=True).run()
+
+        self.create(server, '01').run()
+
+        assert self.read_cards(namespaces_path, '01') == ['menina', 'casa']
+
+    def test_prefetch_reports_progress(self, namespaces_path, server, capsys):
+        translator = self.create(server, '02', report_interval=0)
+
+        translator.prefetch()
+
+        assert capsys.readouterr().out.count(' req/s, ') == 3
+        assert translator.stats['prefetched'] == 3
+
+    def test_exclude_skips_words_of_other_namespaces(self, namespaces_path, server):
+        (namespaces_path / '01' / 'words.txt').write_text('menina\ngato\ncasa\nabelha\n')
+        translator = self.create(server, '01', exclude_words_from=['02'], exclude=True)
+
+        translator.run()
+
+        assert self.read_cards(namespaces_path, '01') == ['abelha', 'gato']
+        assert translator.stats['raw_words_after_exclusion'] == 2
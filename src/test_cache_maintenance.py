@@ -0,0 +1,70 @@
+import io
+import json
+import time
+
+import pytest
+
+import cache_maintenance
+import word_index
+from cache_maintenance import get_sqlite_stats, iter_keys, prune, export_jsonl, vacuum
+from translation_cache import SqliteCache
+
+RESPONSE = [[['девочка', 'menina', None, None, 10]], None, 'pt']
+
+
+class TestCacheMaintenance:
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = str(tmp_path / 'cache.sqlite3')
+        for translator, dest in [('googletranslator', 'ru'), ('googletranslator', 'en'), ('lingvotranslator', 'ru')]:
+            cache = SqliteCache(path, translator, 'pt', dest)
+            cache.put_many([('menina', RESPONSE), ('menino', RESPONSE)])
+            cache.close()
+        return path
+
+    def test_stats(self, path):
+        stats = get_sqlite_stats(path, translator='googletranslator')
+
+        assert sorted(stats['scopes']) == ['googletranslator pt->en', 'googletranslator pt->ru']
+        assert stats['scopes']['googletranslator pt->ru']['entries'] == 2
+        assert stats['scopes']['googletranslator pt->ru']['codecs'] == {'json-zlib': 2}
+
+    def test_keys(self, path):
+        assert list(iter_keys(path, dest='en')) == [
+            ('googletranslator', 'pt', 'en', 'menina'), ('googletranslator', 'pt', 'en', 'menino')
+        ]
+
+    def test_prune_by_age(self, path):
+        assert prune(path, older_than_days=1) == 0
+        time.sleep(0.01)
+
+        assert prune(path, older_than_days=0, dry_run=True, translator='lingvotranslator') == 2
+        assert prune(path, older_than_days=0, translator='lingvotranslator') == 2
+        assert len(list(iter_keys(path))) == 4
+
+    def test_export(self, path):
+        out = io.StringIO()
+
+        assert export_jsonl(path, out, dest='ru', translator='lingvotranslator') == 2
+        assert json.loads(out.getvalue().splitlines()[0])['response'] == RESPONSE
+
+    def test_vacuum(self, path):
+        prune(path, older_than_days=-1)
+
+        before, after = vacuum(path)
+
+        assert after <= before
+
+    def test_prune_keeps_normalized_words_of_namespaces(self, path, tmp_path, monkeypatch):
+        namespaces_path = tmp_path / 'namespaces'
+        (namespaces_path / '01').mkdir(parents=True)
+        (namespaces_path / '01' / 'words.txt').write_text('Menina,\nmenino\n')
+        monkeypatch.setattr(word_index, 'get_namespaces_path', lambda: str(namespaces_path))
+        monkeypatch.setattr(cache_maintenance, 'get_namespaces_path', lambda: str(namespaces_path))
+        monkeypatch.setattr(cache_maintenance, 'get_word_index_path', lambda: str(tmp_path / 'word_index.sqlite3'))
+        cache = SqliteCache(path, 'googletranslator', 'pt', 'ru')
+        cache.put('gato', RESPONSE)
+        cache.close()
+
+        assert prune(path, keep_namespaces='*', dest='ru', translator='googletranslator') == 1
+        assert [word for *_, word in iter_keys(path, dest='ru', translator='googletranslator')] == ['menina', 'menino']
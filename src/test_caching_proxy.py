@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from requests import HTTPError
+
+import translation_cache
+from caching_proxy import CachingProxyTranslator, translate_in_order
+from instrumentation import StageMetrics
+
+RESPONSE = [[['девочка', 'menina', None, None, 10]], None, 'pt']
+
+
+class FakeTranslator:
+    def __init__(self, responses=None, batch_size=1):
+        self.src, self.dest = 'pt', 'en'
+        self.responses = responses or dict()
+        self.batch_size = batch_size
+        self.calls = list()
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def __call__(self, word):
+        with self._lock:
+            self.calls.append(word)
+        self.release.wait(5)
+        return self.responses.get(word, RESPONSE)
+
+    def translate_many(self, words):
+        with self._lock:
+            self.calls.append(tuple(words))
+        return {word: self.responses.get(word, RESPONSE) for word in words}
+
+
+class RejectingTranslator(FakeTranslator):
+    def __call__(self, word):
+        super().__call__(word)
+        raise HTTPError(404)
+
+    def translate_many(self, words):
+        super().translate_many(words)
+        raise HTTPError(404)
+
+
+class TestCachingProxyTranslator:
+    @pytest.fixture(autouse=True)
+    def dictionaries_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(translation_cache, 'get_dictionaries_path', lambda: str(tmp_path))
+
+    @pytest.fixture
+    def translator(self):
+        return FakeTranslator(responses=dict(nada=[]))
+
+    @pytest.fixture
+    def proxy(self, translator):
+        proxy = CachingProxyTranslator(translator, cache_name='test')
+        yield proxy
+        proxy.close()
+
+    def test_caches_responses(self, proxy, translator):
+        assert proxy('menina') == RESPONSE
+        assert proxy('menina') == RESPONSE
+        proxy.close()
+
+        reopened = CachingProxyTranslator(translator, cache_name='test', cache_only=True)
+
+        assert reopened('menina') == RESPONSE
+        assert translator.calls == ['menina']
+        reopened.close()
+
+    def test_workers_share_shelve_storage(self, translator):
+        # shelve is not thread-safe, the proxy serializes the workers of BatchTranslator on it
+        proxy = CachingProxyTranslator(translator, cache_name='test', backend='shelve', memory_budget=0)
+        words = [f'word{i}' for i in range(40)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(proxy, words + words))
+
+        assert results == [RESPONSE] * 80
+        assert sorted(translator.calls) == sorted(words)
+        assert proxy.get_cached_many(words) == {word: RESPONSE for word in words}
+        proxy.close()
+
+    def test_cache_scope_of_translator(self, translator):
+        translator.cache_scope = 'googletranslator'
+
+        proxy = CachingProxyTranslator(translator, cache_name='test', memory_budget=0)
+
+        assert proxy.storage.scope == ('googletranslator', 'pt', 'en')
+        proxy.close()
+
+    def test_coalesces_concurrent_misses(self, proxy, translator):
+        translator.release.clear()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(proxy, 'menina') for _ in range(8)]
+            deadline = time.time() + 5
+            while proxy.stats['coalesced'] < 7 and time.time() < deadline:
+                time.sleep(0.01)
+            translator.release.set()
+            results = [future.result() for future in futures]
+
+        assert results == [RESPONSE] * 8
+        assert translator.calls == ['menina']
+        assert proxy.stats['backend_calls'] == 1
+        assert proxy.stats['coalesced'] == 7
+
+    def test_negative_results(self, proxy, translator):
+        assert proxy('nada') is None
+        assert proxy('nada') is None
+
+        assert translator.calls == ['nada']
+        assert proxy.stats['negative_hits'] == 1
+        assert proxy.get_negative_many(['nada', 'menina']).keys() == {'nada'}
+
+    def test_translation_forgets_expired_failures(self, translator):
+        proxy = CachingProxyTranslator(translator, cache_name='test', negative_ttl=0)
+        proxy.negative.put('menina', 'empty')
+
+        assert proxy.translate_many(['menina', 'casa']) == dict(menina=RESPONSE, casa=RESPONSE)
+        assert proxy.negative.remove_many(['menina']) == 0
+        proxy.close()
+
+    def test_translate_many(self, translator):
+        translator.batch_size = 2
+        proxy = CachingProxyTranslator(translator, cache_name='test')
+        proxy('casa')
+        translator.calls.clear()
+
+        result = proxy.translate_many(['menina', 'casa', 'menino', 'nada', 'menina', 'gato'])
+
+        assert translator.calls == [('menina', 'menino'), ('nada', 'gato')]
+        assert result == dict(menina=RESPONSE, casa=RESPONSE, menino=RESPONSE, nada=None, gato=RESPONSE)
+        assert proxy.translate_many(['nada', 'gato']) == dict(nada=None, gato=RESPONSE)
+        assert len(translator.calls) == 2
+        proxy.close()
+
+    def test_times_only_backend_requests(self, translator):
+        metrics = StageMetrics()
+        proxy = CachingProxyTranslator(translator, cache_name='test', metrics=metrics)
+
+        for word in ['menina', 'menina', 'nada', 'nada', 'casa']:
+            proxy(word)
+        proxy.translate_many(['menina', 'nada', 'gato'])
+
+        assert metrics.summary()['stages']['network']['count'] == proxy.stats['backend_calls'] == 4
+        proxy.close()
+
+    @pytest.mark.parametrize('batch_size', [1, 2])
+    def test_translate_many_remembers_client_errors(self, batch_size):
+        translator = RejectingTranslator(batch_size=batch_size)
+        proxy = CachingProxyTranslator(translator, cache_name='test')
+
+        with pytest.raises(HTTPError):
+            proxy.translate_many(['menina'])
+
+        assert proxy.translate_many(['menina']) == dict(menina=None)
+        assert len(translator.calls) == 1
+        assert proxy.stats['negative_hits'] == 1
+        proxy.close()
+
+
+def test_translate_in_order():
+    words = [f'word{i}' for i in range(50)]
+    cached = {word: f'cached {word}' for word in words[::3]}
+    translated = list()
+
+    def translate(word):
+        time.sleep(random.uniform(0, 0.005))
+        translated.append(word)
+        return f'translated {word}'
+
+    result = list(translate_in_order(translate, words, cached, workers=4))
+
+    assert [word for word, _ in result] == words
+    assert result[3] == ('word3', 'cached word3') and result[4] == ('word4', 'translated word4')
+    assert sorted(translated) == sorted(word for word in words if word not in cached)
+
+
+def test_translate_in_order_bounds_work_in_flight():
+    words = [f'word{i}' for i in range(40)]
+    started = list()
+    lag = list()
+
+    def translate(word):
+        started.append(word)
+        return word
+
+    for consumed, (word, _) in enumerate(translate_in_order(translate, words, dict(), workers=3), start=1):
+        lag.append(len(started) - consumed)
+
+    assert max(lag) <= 2 * 3
+
+
+def test_translate_in_order_skips_blank_words():
+    translated = list()
+
+    def translate(word):
+        translated.append(word)
+        return word.upper()
+
+    result = list(translate_in_order(translate, ['a', '', 'b'], dict(), workers=2))
+
+    assert result == [('a', 'A'), ('', None), ('b', 'B')]
+    assert sorted(translated) == ['a', 'b']
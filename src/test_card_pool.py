@@ -0,0 +1,29 @@
+from collections import Counter
+
+from benchmarks.samples import FALLBACK_RESPONSES
+from card_pool import CardPool, create_cards
+from mock_server import get_google_fallback
+
+
+class TestCardPool:
+    def get_items(self):
+        items = list()
+        for i in range(25):
+            items.extend(FALLBACK_RESPONSES.items())
+            items.append((f'palavra{i}', get_google_fallback(f'palavra{i}', 'pt', 'en')))
+            items.append((f'nada{i}', None))
+        return items
+
+    def test_same_cards_in_order(self):
+        items = self.get_items()
+        expected, expected_stats, _, _ = create_cards(items)
+        stats = Counter()
+
+        cards = list(CardPool(processes=2, shard_size=7, stats=stats).iter_cards(items))
+
+        assert cards == expected
+        assert cards[-1] is None and cards[2].startswith('palavra0\t')
+        assert stats == expected_stats
+
+    def test_empty(self):
+        assert list(CardPool(processes=2).iter_cards([])) == list()
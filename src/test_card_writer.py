@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from card_writer import CheckpointedCardWriter
+
+WORDS = [f'word{i}' for i in range(10)]
+
+
+class TestCheckpointedCardWriter:
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / 'anki.cards')
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return f.read().splitlines()
+
+    def interrupted_run(self, path, count):
+        writer = CheckpointedCardWriter(path, WORDS, checkpoint_every=3)
+        writer.open()
+        for word in WORDS[:count]:
+            writer.write(f'{word}\tcard')
+        writer.close()
+
+    def test_resume(self, path):
+        self.interrupted_run(path, count=4)
+        writer = CheckpointedCardWriter(path, WORDS, checkpoint_every=3)
+
+        done = writer.open()
+        for word in WORDS[done:]:
+            writer.write(None if word == 'word7' else f'{word}\tcard')
+        writer.commit()
+
+        assert done == 4
+        assert self.read(path) == [f'{word}\tcard' for word in WORDS if word != 'word7']
+        assert not os.path.exists(f'{path}.checkpoint')
+        assert not os.path.exists(f'{path}.partial')
+
+    def test_other_words_start_from_scratch(self, path):
+        self.interrupted_run(path, count=4)
+        writer = CheckpointedCardWriter(path, WORDS[1:])
+
+        assert writer.open() == 0
+        writer.close()
+
+    def test_other_options_start_from_scratch(self, path):
+        self.interrupted_run(path, count=4)
+        writer = CheckpointedCardWriter(path, WORDS, options=dict(enrich=True))
+
+        assert writer.open() == 0
+        writer.close()
+
+    def test_previous_file_kept_until_commit(self, path):
+        with open(path, 'w') as f:
+            f.write('previous\n')
+
+        self.interrupted_run(path, count=4)
+
+        assert self.read(path) == ['previous']
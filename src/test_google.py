@@ -1,6 +1,28 @@
+import asyncio
+import time
+
 import pytest
 
-from google import GoogleResponseParser, GoogleTranslator
+from benchmarks.samples import FALLBACK_RESPONSES
+from google import GoogleResponseParser, GoogleTranslator, AsyncGoogleTranslator, AnkiCardCreator
+from mock_server import MockTranslationServer
+from rate_limiter import classify, THROTTLED
+
+# a dictionary response with float scores, synonyms (index 11) and examples (index 13)
+LAR_RESPONSE = [
+    [['home', 'lar', None, None, 10]],
+    [['substantivo', ['home', 'household', 'hearth'], [
+        ['home', ['casa', 'lar', 'residência'], None, 0.25],
+        ['household', ['família', 'lar'], None, 0.004],
+        ['hearth', ['lareira', 'lar'], None, 0.002],
+    ], 'lar', 1]],
+    None, 'pt', None,
+    [['lar', None, [['home', 0, True, False, [10]], ['hearth', 0, True, False, [8]]], [[0, 3]], 'lar', 0, 0]],
+    0.98, [], [['pt'], None, [0.98], ['pt']], None, None,
+    [['substantivo', [[['casa', 'residência', 'morada'], 'm_pt_0'], [['família'], 'm_pt_1']], 'lar']],
+    None,
+    [[['o <b>lar</b> é onde está o coração', None, 'm_pt_0', None, 3]]],
+]
 
 
 class TestGoogleResponseParser:
@@ -49,6 +71,22 @@ class TestGoogleResponseParser:
         assert 'взбалтывается' in {t.word for t in card.translations}
         assert 'беринг' in {t.word for t in card.translations}
 
+    @pytest.mark.parametrize('word, response', [('lar', LAR_RESPONSE), *FALLBACK_RESPONSES.items()])
+    def test_prune_keeps_what_the_card_needs(self, parser, word, response):
+        pruned = GoogleResponseParser.prune(response)
+
+        assert pruned[0] is None and len(pruned) <= len(response)
+        assert parser.create_card(word, pruned) == parser.create_card(word, response)
+
+    def test_float_scores_as_the_pydantic_model(self, parser):
+        from benchmarks.bench_cards import pydantic_entities
+        card = AnkiCardCreator.create_card(parser.create_card('lar', LAR_RESPONSE))
+        with pydantic_entities():
+            baseline = AnkiCardCreator.create_card(parser.create_card('lar', LAR_RESPONSE))
+
+        assert card == baseline
+        assert card.startswith('lar\t<div>home (250), household (4), hearth (2)</div>')
+
 
 class TestGoogleResponseParserPortuguese:
     @pytest.fixture
@@ -115,3 +153,37 @@ class TestGoogleResponseParserPortuguese3:
         card = parser.create_card('propriedades', response)
 
         assert {'property', 'transfer', 'acres', 'properties'} == {t.word for t in card.translations}
+
+
+class TestAsyncGoogleTranslator:
+    def test_same_response_as_google_translator(self):
+        with MockTranslationServer(google=FALLBACK_RESPONSES) as server:
+            translator = AsyncGoogleTranslator(dest='ru', src='pt', base_url=server.base_url)
+
+            response = translator('menina')
+            translator.close()
+
+            assert response == GoogleTranslator(dest='ru', src='pt', base_url=server.base_url)('menina')
+
+    def test_concurrent_lookups(self):
+        words = [f'word{i}' for i in range(40)]
+        with MockTranslationServer(latency=0.1) as server:
+            translator = AsyncGoogleTranslator(dest='ru', src='pt', base_url=server.base_url, concurrency=20)
+
+            started = time.perf_counter()
+            responses = asyncio.run(translator.translate_concurrently(words))
+            elapsed = time.perf_counter() - started
+
+        assert list(responses) == words
+        # 40 sequential lookups would take 4s
+        assert elapsed < 2
+
+    def test_throttled(self):
+        with MockTranslationServer(throttle_rate=1) as server:
+            translator = AsyncGoogleTranslator(dest='ru', src='pt', base_url=server.base_url)
+
+            with pytest.raises(Exception) as ex:
+                translator('menina')
+            translator.close()
+
+        assert classify(ex.value) == THROTTLED
@@ -0,0 +1,44 @@
+import json
+
+from instrumentation import Histogram, StageMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHistogram:
+    def test_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.add(value / 1000)
+
+        summary = histogram.summary()
+
+        assert summary['count'] == 100
+        assert summary['p50_ms'] == 51
+        assert summary['p99_ms'] == 100
+
+
+class TestStageMetrics:
+    def test_summary(self, tmp_path):
+        clock = FakeClock()
+        metrics = StageMetrics(clock=clock)
+        for _ in range(4):
+            with metrics.time('network'):
+                clock.now += 0.5
+        metrics.count('cache_hits', 6)
+        metrics.count('cache_misses', 4)
+        path = tmp_path / 'stats.json'
+
+        metrics.dump(str(path), translator_stats={'throttled': 3})
+
+        summary = json.loads(path.read_text())
+        assert summary['stages']['network']['p50_ms'] == 500
+        assert summary['cache_hit_rate'] == 0.6
+        assert summary['requests_per_s'] == 2
+        assert summary['throttled_429'] == 3
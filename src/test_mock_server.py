@@ -0,0 +1,62 @@
+import pytest
+import requests
+
+from benchmarks.samples import FALLBACK_RESPONSES
+from google import GoogleTranslator, GoogleResponseParser
+from mock_server import MockTranslationServer, get_microsoft_responses
+from rate_limiter import RateLimitedTranslator, classify, THROTTLED
+
+
+class TestMockTranslationServer:
+    def test_google_replay(self):
+        with MockTranslationServer(google=FALLBACK_RESPONSES) as server:
+            translator = GoogleTranslator(dest='ru', src='pt', base_url=server.base_url)
+
+            response = translator('menina')
+
+        assert response == FALLBACK_RESPONSES['menina']
+        assert GoogleResponseParser.create_card('menina', response).translations
+
+    def test_google_unknown_word(self):
+        with MockTranslationServer() as server:
+            response = GoogleTranslator(dest='ru', src='pt', base_url=server.base_url)('casa')
+
+        assert [t.word for t in GoogleResponseParser.create_card('casa', response).translations] == ['casa']
+
+    def test_throttled(self):
+        with MockTranslationServer(google=FALLBACK_RESPONSES, throttle_rate=1) as server:
+            translator = GoogleTranslator(dest='ru', src='pt', base_url=server.base_url)
+
+            with pytest.raises(Exception) as ex:
+                translator('menina')
+
+        assert classify(ex.value) == THROTTLED
+
+    def test_rate_limited_translator_recovers(self):
+        with MockTranslationServer(google=FALLBACK_RESPONSES, throttle_rate=0.3, failure_rate=0.2) as server:
+            translator = RateLimitedTranslator(
+                GoogleTranslator(dest='ru', src='pt', base_url=server.base_url), qps=1000, base_delay=0
+            )
+
+            responses = [translator('menina') for _ in range(20)]
+
+        assert responses == [FALLBACK_RESPONSES['menina']] * 20
+        assert translator.stats['throttled'] == server.stats['throttled']
+        assert translator.stats['transient'] == server.stats['failed']
+
+    def test_microsoft_and_lingvo(self):
+        with MockTranslationServer(lingvo={'menina': [{'Dictionary': 'x'}]}) as server:
+            microsoft = requests.post(f'{server.base_url}/dictionary/lookup', json=[{'text': 'Menina'}]).json()
+            token = requests.post(f'{server.base_url}/api/v1.1/authenticate').text
+            lingvo = requests.get(f'{server.base_url}/api/v1/Translation?text=menina')
+            missing = requests.get(f'{server.base_url}/api/v1/Translation?text=casa')
+
+        assert microsoft[0]['normalizedSource'] == 'menina'
+        assert token == 'mock-token'
+        assert lingvo.json() == [{'Dictionary': 'x'}]
+        assert missing.status_code == 404
+
+    def test_microsoft_responses_in_api_shape_only(self):
+        raw = dict(normalizedSource='menina', displaySource='menina', translations=list())
+
+        assert get_microsoft_responses(dict(menina=raw, menino=object(), casa=None)) == dict(menina=raw)
@@ -0,0 +1,34 @@
+import unicodedata
+
+import pytest
+
+from normalization import normalize, get_lookup_keys
+
+
+class TestNormalization:
+    @pytest.mark.parametrize('line, expected', [
+        ('Menina,', 'menina'), ('  Due   to ', 'due to'), ('«Canção»', 'canção'), ('guarda-chuva!', 'guarda-chuva'),
+        ("d'água", "d'água"), ('...', ''), ('', ''),
+    ])
+    def test_normalize(self, line, expected):
+        assert normalize(line) == expected
+
+    def test_normalize_composes(self):
+        assert normalize(unicodedata.normalize('NFD', 'Ação')) == 'ação'
+
+    def test_keys_keep_lines_in_order(self):
+        assert get_lookup_keys(['Casa', 'casas', '', 'casa.']) == ['casa', 'casas', '', 'casa']
+
+    def test_lemmatize_pt(self):
+        lines = ['menina', 'Meninas', 'canções', 'canção', 'leões']
+
+        assert get_lookup_keys(lines, 'pt') == ['menina', 'menina', 'canção', 'canção', 'leões']
+
+    def test_lemmatize_en(self):
+        lines = ['studied', 'study', 'making', 'make', 'buses', 'bus', 'walked']
+
+        assert get_lookup_keys(lines, 'en') == ['study', 'study', 'make', 'make', 'bus', 'bus', 'walked']
+
+    def test_unknown_language(self):
+        with pytest.raises(ValueError):
+            get_lookup_keys(['casas'], 'xx')
@@ -0,0 +1,109 @@
+import pytest
+from requests import HTTPError
+
+from rate_limiter import RateLimitedTranslator, TokenBucket, CircuitBreaker, CircuitOpenError, RetryBudget, \
+    RetryBudgetExhausted, classify, TRANSIENT
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FlakyTranslator:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def __call__(self, word):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return [word]
+
+
+class TestTokenBucket:
+    def test_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=1, clock=clock, sleep=clock.sleep)
+
+        for _ in range(5):
+            bucket.acquire()
+
+        assert clock.now == pytest.approx(2.0)
+
+
+class TestRateLimitedTranslator:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def create(self, delegate, clock, **kwargs):
+        return RateLimitedTranslator(delegate, clock=clock, sleep=clock.sleep, **kwargs)
+
+    def test_retries_throttled(self, clock):
+        delegate = FlakyTranslator([HTTPError(429), HTTPError(429)])
+        translator = self.create(delegate, clock, qps=4)
+
+        assert translator('word') == ['word']
+        assert delegate.calls == 3
+        assert translator.stats['throttled'] == 2
+        assert translator.qps < 4
+
+    def test_unknown_error_is_not_retried(self, clock):
+        delegate = FlakyTranslator([ValueError('broken')])
+        translator = self.create(delegate, clock)
+
+        with pytest.raises(ValueError):
+            translator('word')
+        assert delegate.calls == 1
+
+    def test_retry_budget(self, clock):
+        delegate = FlakyTranslator([HTTPError(503)] * 5)
+        translator = self.create(delegate, clock, retry_budget=RetryBudget(ratio=0, reserve=2))
+
+        with pytest.raises(RetryBudgetExhausted):
+            translator('word')
+        assert delegate.calls == 3
+
+    def test_circuit_breaker(self, clock):
+        delegate = FlakyTranslator([ConnectionError('Network is unreachable')] * 3)
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+        translator = self.create(delegate, clock, circuit_breaker=breaker)
+
+        with pytest.raises(CircuitOpenError):
+            translator('word')
+        clock.sleep(30)
+
+        assert translator('word') == ['word']
+
+    def test_lingvo_failed_response(self, clock):
+        responses = [dict(status='failed', status_code=429), dict(status='ok')]
+        translator = self.create(lambda word: responses.pop(0), clock)
+
+        assert translator('word') == dict(status='ok')
+        assert translator.stats['throttled'] == 1
+
+    def test_translate_many(self, clock):
+        delegate = FlakyTranslator([HTTPError(429)])
+        delegate.batch_size = 10
+        delegate.translate_many = lambda words: {word: delegate(word) for word in words}
+        translator = self.create(delegate, clock)
+
+        assert translator.batch_size == 10
+        assert translator.translate_many(['a', 'b']) == {'a': ['a'], 'b': ['b']}
+        assert translator.stats['throttled'] == 1
+
+
+class TestClassify:
+    def test_httpcore_errors(self):
+        httpcore = pytest.importorskip('httpcore')
+
+        assert classify(httpcore.ConnectError('Name or service not known')) == TRANSIENT
+        assert classify(ValueError('broken')) is None
@@ -0,0 +1,237 @@
+import os
+import shelve
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from entities import DictionaryCard, Translation
+import translation_cache
+from translation_cache import SqliteCache, ParsedCardCache, NegativeCache, TieredCache, migrate_shelve, encode, decode, \
+    open_cache, JSON_ZLIB, PICKLE
+
+RESPONSE = [[['девочка', 'menina', None, None, 10], [None, None, 'devochka']], None, 'pt']
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSqliteCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = SqliteCache(str(tmp_path / 'cache.sqlite3'), 'googletranslator', 'pt', 'ru')
+        yield cache
+        cache.close()
+
+    def test_get_put(self, cache):
+        assert cache.get('menina') is None
+
+        cache.put('menina', RESPONSE)
+
+        assert cache.get('menina') == RESPONSE
+        assert len(cache) == 1
+
+    def test_scope(self, cache):
+        cache.put('menina', RESPONSE)
+        other = SqliteCache(cache.path, 'googletranslator', 'pt', 'en')
+
+        assert other.get('menina') is None
+        assert len(other) == 0
+        other.close()
+
+    def test_get_many(self, cache):
+        words = [f'word{i}' for i in range(1200)]
+        cache.put_many((word, [word]) for word in words[::2])
+
+        result = cache.get_many(words)
+
+        assert result == {word: [word] for word in words[::2]}
+
+    def test_concurrent_readers(self, cache):
+        cache.put_many((f'word{i}', [i]) for i in range(100))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(cache.get, [f'word{i}' for i in range(100)]))
+
+        assert results == [[i] for i in range(100)]
+
+    def test_migrate_shelve(self, cache, tmp_path):
+        shelve_path = str(tmp_path / 'portuguese')
+        with shelve.open(shelve_path) as storage:
+            storage['menina'] = RESPONSE
+            storage['menino'] = None
+
+        assert migrate_shelve(shelve_path, cache) == 2
+        assert cache.get_many(['menina', 'menino']) == {'menina': RESPONSE, 'menino': None}
+
+
+class TestOpenCache:
+    @pytest.fixture(autouse=True)
+    def dictionaries_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(translation_cache, 'get_dictionaries_path', lambda: str(tmp_path))
+        return tmp_path
+
+    def test_imports_shelve_once(self, dictionaries_path):
+        with shelve.open(str(dictionaries_path / 'portuguese')) as storage:
+            storage['menina'] = RESPONSE
+
+        cache = open_cache('portuguese', 'googletranslator', 'pt', 'en')
+
+        assert cache.get('menina') == RESPONSE
+        cache.close()
+
+    def test_unreadable_shelve_is_an_error(self, dictionaries_path):
+        # e.g. a Berkeley DB file on a python without _dbm
+        (dictionaries_path / 'portuguese.db').write_bytes(b'\x00' * 64)
+
+        with pytest.raises(ValueError):
+            open_cache('portuguese', 'googletranslator', 'pt', 'en')
+
+        assert not os.path.exists(dictionaries_path / 'portuguese.sqlite3')
+
+
+class TestCodecs:
+    def test_json_zlib_roundtrip(self):
+        codec, blob = encode(RESPONSE)
+
+        assert codec == JSON_ZLIB
+        assert decode(codec, blob) == RESPONSE
+
+    def test_falls_back_to_pickle(self):
+        value = {'word': {1, 2}}
+
+        codec, blob = encode(value)
+
+        assert codec == PICKLE
+        assert decode(codec, blob) == value
+
+    def test_prune(self, tmp_path):
+        cache = SqliteCache(str(tmp_path / 'cache.sqlite3'), 'googletranslator', prune=lambda value: value[:1])
+        cache.put('menina', RESPONSE)
+
+        assert cache.get('menina') == RESPONSE[:1]
+        cache.close()
+
+
+class TestParsedCardCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = ParsedCardCache(str(tmp_path / 'cache.sqlite3'), parser_version=1)
+        yield cache
+        cache.close()
+
+    def test_roundtrip(self, cache):
+        card = DictionaryCard(word='menina', translations=[Translation(word='девочка', confidence=10)])
+        response_hash = cache.get_hash('menina', RESPONSE)
+
+        cache.put(response_hash, card)
+        cache.flush()
+
+        assert cache.get(response_hash) == card
+        assert cache.get(cache.get_hash('menino', RESPONSE)) is None
+
+    def test_parser_version(self, cache):
+        response_hash = cache.get_hash('menina', RESPONSE)
+        cache.put(response_hash, DictionaryCard(word='menina'))
+        cache.close()
+
+        newer = ParsedCardCache(cache.path, parser_version=2)
+
+        assert newer.get(response_hash) is None
+        newer.close()
+
+
+class TestNegativeCache:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def cache(self, tmp_path, clock):
+        cache = NegativeCache(str(tmp_path / 'cache.sqlite3'), 'googletranslator', 'pt', 'ru', ttl=100,
+                              poison_after=2, clock=clock)
+        yield cache
+        cache.close()
+
+    def test_ttl(self, cache, clock):
+        cache.put('baliset', 'empty')
+
+        assert cache.get('baliset') == 'empty'
+        clock.now += 101
+        assert cache.get('baliset') is None
+
+    def test_poisoned_after_repeated_failures(self, cache, clock):
+        cache.put('baliset', 'http 404')
+        clock.now += 101
+        cache.put('baliset', 'http 404')
+        clock.now += 1000
+
+        assert cache.get_many(['baliset', 'menina']) == {'baliset': 'http 404'}
+        assert cache.poisoned() == ['baliset']
+
+        cache.unpoison(['baliset'])
+        assert cache.get('baliset') is None
+
+    def test_remove_many(self, cache):
+        cache.put('menina', 'empty')
+
+        assert cache.remove_many(['menina', 'menino']) == 1
+        assert cache.remove_many(['menina']) == 0
+        cache.put('menina', 'empty')
+        assert cache.poisoned() == []
+
+
+class TestTieredCache:
+    @pytest.fixture
+    def backend(self, tmp_path):
+        backend = SqliteCache(str(tmp_path / 'cache.sqlite3'), 'googletranslator', 'pt', 'ru')
+        yield backend
+        backend.close()
+
+    def test_write_behind(self, backend):
+        cache = TieredCache(backend, write_batch=3, flush_interval=3600)
+
+        cache.put('menina', RESPONSE)
+        cache.put('menino', RESPONSE)
+
+        assert cache.get('menina') == RESPONSE
+        assert backend.get('menina') is None
+        cache.put('casa', RESPONSE)
+        assert backend.get_many(['menina', 'menino', 'casa']).keys() == {'menina', 'menino', 'casa'}
+        assert cache.stats['flushes'] == 1
+
+    def test_eviction(self, backend):
+        backend.put_many((f'word{i}', [i] * 10) for i in range(10))
+        size = backend.prepare([1] * 10)[2]
+        cache = TieredCache(backend, max_bytes=3 * size)
+
+        cache.get_many([f'word{i}' for i in range(10)])
+        cache.get('word9')
+        cache.get('word0')
+
+        assert cache.stats['evictions'] == 8
+        assert cache.stats['hits'] == 1
+        assert cache.get('word0') == [0] * 10
+        assert cache.size <= 3 * size
+
+    def test_memory_holds_pruned_values(self, tmp_path):
+        backend = SqliteCache(str(tmp_path / 'pruned.sqlite3'), 'googletranslator', prune=lambda value: value[:1])
+        cache = TieredCache(backend, write_batch=1)
+
+        cache.put('menina', RESPONSE)
+
+        assert cache.get('menina') == backend.get('menina') == RESPONSE[:1]
+        assert cache.stats['hits'] == 1
+        assert cache.size == len(backend.encode(RESPONSE)[1])
+        cache.close()
+
+    def test_close_flushes(self, backend):
+        cache = TieredCache(SqliteCache(backend.path, *backend.scope), write_batch=100)
+        cache.put('menino', RESPONSE)
+        cache.close()
+
+        assert backend.get('menino') == RESPONSE
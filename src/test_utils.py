@@ -0,0 +1,72 @@
+import random
+import string
+
+import nltk
+import transliterate
+
+from benchmarks.bench_near_duplicates import remove_near_duplicates_within_reference
+from similarity import levenshtein, bounded_levenshtein, is_near, near_many
+from transliteration import is_russian, from_russian, get_stats
+from utils import remove_near_duplicates_within, get_distance
+
+
+class TestRemoveNearDuplicatesWithin:
+    def test_basic(self):
+        words = ['garota', 'moça', 'garotas', 'moças', 'mulher']
+
+        assert remove_near_duplicates_within(words) == ['garota', 'moça', 'mulher']
+
+    def test_longer_word_removes_shorter_survivor(self):
+        # 'aab' survives its own pass and is then removed by the stem of 'abz'
+        assert remove_near_duplicates_within(['aab', 'abz']) == ['abz']
+
+    def test_same_as_reference(self):
+        rng = random.Random(42)
+        for _ in range(2000):
+            words = [''.join(rng.choices('abc', k=rng.randint(0, 4))) for _ in range(rng.randint(0, 8))]
+
+            assert remove_near_duplicates_within(words) == remove_near_duplicates_within_reference(words)
+
+
+class TestSimilarity:
+    @staticmethod
+    def random_pairs(count, seed=42):
+        rng = random.Random(seed)
+        for _ in range(count):
+            yield tuple(''.join(rng.choices('abcд', k=rng.randint(0, 8))) for _ in range(2))
+
+    def test_levenshtein(self):
+        for a, b in self.random_pairs(2000):
+            assert levenshtein(a, b) == nltk.edit_distance(a, b)
+
+    def test_bounded_levenshtein(self):
+        for max_distance in range(5):
+            for a, b in self.random_pairs(500, seed=max_distance):
+                assert bounded_levenshtein(a, b, max_distance) == min(levenshtein(a, b), max_distance + 1)
+
+    def test_is_near_matches_get_distance(self):
+        for a, b in self.random_pairs(2000):
+            assert is_near(a, b) == (get_distance(a, b) <= 40)
+
+    def test_near_many(self):
+        candidates = [b for _, b in self.random_pairs(100) if b]
+
+        assert near_many('abcд', candidates) == [is_near('abcд', c) for c in candidates]
+
+
+class TestTransliteration:
+    def test_is_russian_matches_translit(self):
+        rng = random.Random(42)
+        alphabet = string.ascii_letters + string.punctuation + ' абвгдеёжзийклмнопрстуфхцчшщъыьэюяЁЖ'
+        for _ in range(2000):
+            text = ''.join(rng.choices(alphabet, k=rng.randint(0, 6)))
+
+            assert is_russian(text) == (transliterate.translit(text, 'ru') == text), text
+
+    def test_cached(self):
+        assert from_russian('девочка') == transliterate.translit('девочка', 'ru', reversed=True)
+        hits = get_stats()['from_russian']['hits']
+
+        from_russian('девочка')
+
+        assert get_stats()['from_russian']['hits'] == hits + 1
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from word_index import WordIndex
+
+
+class TestWordIndex:
+    @pytest.fixture
+    def namespaces_path(self, tmp_path):
+        for namespace, words in [('01', 'menina\nmenino\n'), ('02', 'menino\ncasa\n')]:
+            os.makedirs(tmp_path / namespace)
+            (tmp_path / namespace / 'words.txt').write_text(words)
+        return tmp_path
+
+    @pytest.fixture
+    def index(self, namespaces_path, tmp_path):
+        index = WordIndex(str(tmp_path / 'word_index.sqlite3'), str(namespaces_path))
+        yield index
+        index.close()
+
+    def test_lookup(self, index):
+        assert index.update_all(['01', '02']) == {'01': 2, '02': 2}
+
+        assert index.lookup(['menino', 'casa', 'gato']) == {'menino': {'01', '02'}, 'casa': {'02'}}
+        assert index.lookup(['menino', 'casa'], ['01']) == {'menino': {'01'}}
+
+    def test_unchanged_file_is_not_read(self, index, namespaces_path):
+        index.update('01')
+        # same mtime and size, a changed content would be missed, which is what makes the update cheap
+        path = namespaces_path / '01' / 'words.txt'
+        stat = os.stat(path)
+        path.write_text('menino\nmenina\n')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert index.update('01') == 0
+
+    def test_incremental_update(self, index, namespaces_path):
+        index.update('01')
+        first_seen = index.get_first_seen('menina')
+        (namespaces_path / '01' / 'words.txt').write_text('menino\ngato\ncão\n')
+
+        assert index.update('01') == 2
+        assert index.lookup(['menina', 'gato', 'cão']) == {'gato': {'01'}, 'cão': {'01'}}
+        assert index.count('01') == 3
+        assert index.get_first_seen('gato') >= first_seen
@@ -0,0 +1,690 @@
+import argparse
+import dbm
+import hashlib
+import json
+import os
+import pickle
+import shelve
+import sys
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+from utils import get_repo_path, chunker
+
+SQLITE_BATCH = 500
+NEGATIVE_TTL = 7 * 24 * 3600
+
+PICKLE = 'pickle'
+JSON_ZLIB = 'json-zlib'
+
+# Fragments that recur in every Google response. zlib matches against this preset dictionary,
+# so even a single short response compresses well. The most frequent fragments go last.
+# Changing it makes existing json-zlib rows unreadable, add a new codec name instead.
+ZLIB_DICTIONARY = ''.join([
+    '"имя прилагательное","наречие","предлог","союз","местоимение","частица","междометие",',
+    '"adjective","adverb","preposition","conjunction","pronoun","interjection","abbreviation",',
+    '"adjetivo","advérbio","substantivo","verbo","имя существительное","глагол","noun","verb",',
+    '[[null,null,[[0,',
+    ',null,null,null,null,null,null,null,null,',
+    ',0,true,false,[',
+    ']],[[',
+    '],null,',
+    ',null,[["',
+    '",null,[["',
+    '",["',
+    '"],null,0.',
+    '","',
+    ',null,',
+    'null,null,',
+    '"]]]]',
+]).encode()
+
+
+def get_dictionaries_path():
+    return f'{get_repo_path()}/data/dictionaries'
+
+
+class CacheBackend:
+    def get(self, word):
+        raise NotImplementedError
+
+    def get_many(self, words) -> dict:
+        result = dict()
+        for word in words:
+            if (value := self.get(word)) is not None:
+                result[word] = value
+        return result
+
+    def put(self, word, value):
+        raise NotImplementedError
+
+    def put_many(self, items):
+        for word, value in items:
+            self.put(word, value)
+
+    @staticmethod
+    def get_size(value):
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_many_sized(self, words) -> dict:
+        # word -> (value, bytes it takes in the backend), the memory budget of TieredCache
+        return {word: (value, self.get_size(value)) for word, value in self.get_many(words).items()}
+
+    def prepare(self, value):
+        # (value as get would return it, payload for put_prepared_many, bytes it takes in the backend)
+        return value, value, self.get_size(value)
+
+    def put_prepared_many(self, items):
+        self.put_many(items)
+
+    def keys(self):
+        raise NotImplementedError
+
+    def items(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def close(self):
+        pass
+
+
+class ShelveCache(CacheBackend):
+    def __init__(self, path, flag='c'):
+        self.storage = shelve.open(path, flag)
+        # shelve is not thread-safe, workers of BatchTranslator share this instance
+        self._lock = threading.Lock()
+
+    def get(self, word):
+        with self._lock:
+            return self.storage.get(word)
+
+    def put(self, word, value):
+        with self._lock:
+            self.storage[word] = value
+
+    def keys(self):
+        with self._lock:
+            return list(self.storage.keys())
+
+    def items(self):
+        for word in self.keys():
+            yield word, self.get(word)
+
+    def __len__(self):
+        with self._lock:
+            return len(self.storage)
+
+    def close(self):
+        with self._lock:
+            self.storage.sync()
+            self.storage.close()
+
+
+class TieredCache(CacheBackend):
+    """
+    An LRU of decoded values in front of a persistent backend, bounded by the size the values take in the backend,
+    e.g. their compressed blobs in sqlite, which comes with reading or encoding them anyway.
+    Values are kept as the backend stores them, e.g. pruned, so a hit does not depend on the tier it came from.
+    New entries are encoded on put and written behind in batches of write_batch, or once flush_interval passed,
+    and on close. Entries waiting to be written are never evicted.
+    """
+
+    def __init__(self, backend: CacheBackend, max_bytes=64 * 2 ** 20, write_batch=50, flush_interval=5.0,
+                 clock=time.monotonic):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.flushed_at = clock()
+        self.size = 0
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        # word -> (value, payload of the backend)
+        self._pending = dict()
+        self._lock = threading.RLock()
+
+    def _remember(self, word, value, size):
+        if value is None:
+            return
+        if word in self._entries:
+            self.size -= self._entries.pop(word)[1]
+        self._entries[word] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes and self._entries:
+            evicted, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.stats['evictions'] += 1
+            self.stats['evicted_bytes'] += evicted_size
+
+    def _lookup(self, word):
+        if word in self._entries:
+            self._entries.move_to_end(word)
+            return self._entries[word][0]
+        if word in self._pending:
+            return self._pending[word][0]
+
+    def get(self, word):
+        with self._lock:
+            if (value := self._lookup(word)) is not None:
+                self.stats['hits'] += 1
+                return value
+            self.stats['misses'] += 1
+        value, size = self.backend.get_many_sized([word]).get(word, (None, 0))
+        with self._lock:
+            self._remember(word, value, size)
+        return value
+
+    def get_many(self, words) -> dict:
+        result = dict()
+        misses = list()
+        with self._lock:
+            for word in dict.fromkeys(words):
+                if (value := self._lookup(word)) is not None:
+                    result[word] = value
+                else:
+                    misses.append(word)
+            self.stats['hits'] += len(result)
+            self.stats['misses'] += len(misses)
+        loaded = self.backend.get_many_sized(misses) if misses else dict()
+        with self._lock:
+            for word, (value, size) in loaded.items():
+                self._remember(word, value, size)
+                result[word] = value
+        return result
+
+    def put(self, word, value):
+        self.put_many([(word, value)])
+
+    def put_many(self, items):
+        prepared = [(word, *self.backend.prepare(value)) for word, value in items]
+        with self._lock:
+            for word, value, payload, size in prepared:
+                self._pending[word] = (value, payload)
+                self._remember(word, value, size)
+            due = len(self._pending) >= self.write_batch or self.clock() - self.flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, dict()
+            self.flushed_at = self.clock()
+            if pending:
+                # under the lock, so a reader never misses an entry that is neither pending nor written
+                self.backend.put_prepared_many((word, payload) for word, (_, payload) in pending.items())
+                self.stats['flushes'] += 1
+                self.stats['written'] += len(pending)
+
+    def keys(self):
+        self.flush()
+        return self.backend.keys()
+
+    def items(self):
+        self.flush()
+        return self.backend.items()
+
+    def __len__(self):
+        self.flush()
+        return len(self.backend)
+
+    def close(self):
+        self.flush()
+        self.backend.close()
+
+
+class SqliteStore:
+    # WAL mode and a connection per thread, so readers never block each other nor the writer
+    SCHEMA = None
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = list()
+        self._lock = threading.Lock()
+        with self._connection as connection:
+            connection.executescript(self.SCHEMA)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SqliteCache(SqliteStore, CacheBackend):
+    """Responses keyed by (translator, src, dest, word)"""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS translations (
+            translator TEXT NOT NULL,
+            src TEXT NOT NULL,
+            dest TEXT NOT NULL,
+            word TEXT NOT NULL,
+            codec TEXT NOT NULL,
+            response BLOB,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (translator, src, dest, word)
+        ) WITHOUT ROWID
+    '''
+
+    def __init__(self, path, translator, src='', dest='', codec=JSON_ZLIB, prune=None):
+        self.scope = (translator, src or '', dest or '')
+        self.codec = codec
+        # e.g. GoogleResponseParser.prune, drops the parts of a response nobody reads
+        self.prune = prune
+        super().__init__(path)
+
+    def encode(self, value):
+        return encode(value, self.codec, self.prune)
+
+    @staticmethod
+    def decode(codec, blob):
+        return decode(codec, blob)
+
+    def get_many_sized(self, words) -> dict:
+        return {word: (self.decode(codec, blob), len(blob)) for word, codec, blob in self._select_many(words)}
+
+    def prepare(self, value):
+        if self.prune and value:
+            value = self.prune(value)
+        codec, blob = encode(value, self.codec)
+        return value, (codec, blob), len(blob)
+
+    def get(self, word):
+        row = self._connection.execute(
+            'SELECT codec, response FROM translations WHERE translator=? AND src=? AND dest=? AND word=?',
+            (*self.scope, word)
+        ).fetchone()
+        if row:
+            return self.decode(*row)
+
+    def _select_many(self, words):
+        for chunk in chunker(list(dict.fromkeys(words)), SQLITE_BATCH):
+            yield from self._connection.execute(
+                f'SELECT word, codec, response FROM translations '
+                f'WHERE translator=? AND src=? AND dest=? AND word IN ({",".join("?" * len(chunk))})',
+                (*self.scope, *chunk)
+            )
+
+    def get_many(self, words) -> dict:
+        return {word: self.decode(codec, blob) for word, codec, blob in self._select_many(words)}
+
+    def put(self, word, value):
+        self.put_many([(word, value)])
+
+    def put_many(self, items):
+        self.put_prepared_many((word, self.encode(value)) for word, value in items)
+
+    def put_prepared_many(self, items):
+        # items: (word, (codec, blob))
+        now = time.time()
+        rows = [(*self.scope, word, *encoded, now) for word, encoded in items]
+        with self._connection as connection:
+            connection.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def keys(self):
+        rows = self._connection.execute(
+            'SELECT word FROM translations WHERE translator=? AND src=? AND dest=?', self.scope
+        )
+        return [word for word, in rows]
+
+    def items(self):
+        rows = self._connection.execute(
+            'SELECT word, codec, response FROM translations WHERE translator=? AND src=? AND dest=?', self.scope
+        )
+        for word, codec, blob in rows:
+            yield word, self.decode(codec, blob)
+
+    def __len__(self):
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM translations WHERE translator=? AND src=? AND dest=?', self.scope
+        ).fetchone()[0]
+
+
+class NegativeCache(SqliteStore):
+    """
+    Words a translator had nothing for (empty responses, 4xx), keyed like SqliteCache.
+    An entry expires after ttl and the word is tried again, after poison_after failures the word is
+    poisoned: it is never tried again until it is unpoisoned.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS negative_results (
+            translator TEXT NOT NULL,
+            src TEXT NOT NULL,
+            dest TEXT NOT NULL,
+            word TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            failures INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (translator, src, dest, word)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS poisoned_words (
+            translator TEXT NOT NULL,
+            src TEXT NOT NULL,
+            dest TEXT NOT NULL,
+            word TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (translator, src, dest, word)
+        ) WITHOUT ROWID;
+    '''
+
+    def __init__(self, path, translator, src='', dest='', ttl=NEGATIVE_TTL, poison_after=3, clock=time.time):
+        self.scope = (translator, src or '', dest or '')
+        self.ttl = ttl
+        self.poison_after = poison_after
+        self.clock = clock
+        super().__init__(path)
+
+    def get_many(self, words) -> dict:
+        # word -> reason, for poisoned words and negative results younger than ttl
+        result = dict()
+        for chunk in chunker(list(dict.fromkeys(words)), SQLITE_BATCH):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._connection.execute(
+                f'SELECT word, reason FROM negative_results WHERE translator=? AND src=? AND dest=? '
+                f'AND updated_at > ? AND word IN ({placeholders}) '
+                f'UNION ALL SELECT word, reason FROM poisoned_words WHERE translator=? AND src=? AND dest=? '
+                f'AND word IN ({placeholders})',
+                (*self.scope, self.clock() - self.ttl, *chunk, *self.scope, *chunk)
+            )
+            result.update(rows)
+        return result
+
+    def get(self, word):
+        return self.get_many([word]).get(word)
+
+    def put(self, word, reason):
+        with self._connection as connection:
+            connection.execute(
+                'INSERT INTO negative_results VALUES (?, ?, ?, ?, ?, 1, ?) '
+                'ON CONFLICT (translator, src, dest, word) DO UPDATE '
+                'SET reason=excluded.reason, failures=failures + 1, updated_at=excluded.updated_at',
+                (*self.scope, word, reason, self.clock())
+            )
+            failures, = connection.execute(
+                'SELECT failures FROM negative_results WHERE translator=? AND src=? AND dest=? AND word=?',
+                (*self.scope, word)
+            ).fetchone()
+        if failures >= self.poison_after:
+            self.poison([word], reason)
+
+    def remove_many(self, words) -> int:
+        # only words that have a row, expired ones included, cost a write, all of them in one transaction
+        existing = list()
+        for chunk in chunker(list(dict.fromkeys(words)), SQLITE_BATCH):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._connection.execute(
+                f'SELECT word FROM negative_results WHERE translator=? AND src=? AND dest=? '
+                f'AND word IN ({placeholders})',
+                (*self.scope, *chunk)
+            )
+            existing.extend(word for word, in rows)
+        if existing:
+            with self._connection as connection:
+                connection.executemany(
+                    'DELETE FROM negative_results WHERE translator=? AND src=? AND dest=? AND word=?',
+                    [(*self.scope, word) for word in existing]
+                )
+        return len(existing)
+
+    def poison(self, words, reason='manual'):
+        now = self.clock()
+        with self._connection as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO poisoned_words VALUES (?, ?, ?, ?, ?, ?)',
+                [(*self.scope, word, reason, now) for word in words]
+            )
+
+    def unpoison(self, words):
+        rows = [(*self.scope, word) for word in words]
+        with self._connection as connection:
+            for table in ['poisoned_words', 'negative_results']:
+                connection.executemany(
+                    f'DELETE FROM {table} WHERE translator=? AND src=? AND dest=? AND word=?', rows
+                )
+
+    def poisoned(self):
+        rows = self._connection.execute(
+            'SELECT word FROM poisoned_words WHERE translator=? AND src=? AND dest=? ORDER BY word', self.scope
+        )
+        return [word for word, in rows]
+
+
+class ParsedCardCache(SqliteStore):
+    """
+    Second level cache: parsed cards keyed by a hash of (word, response) and the parser version,
+    so formatting changes downstream of the parser do not pay for parsing again.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS parsed_cards (
+            response_hash TEXT NOT NULL,
+            parser_version INTEGER NOT NULL,
+            card BLOB NOT NULL,
+            PRIMARY KEY (response_hash, parser_version)
+        ) WITHOUT ROWID
+    '''
+
+    def __init__(self, path, parser_version, batch_size=500):
+        self.parser_version = parser_version
+        self.batch_size = batch_size
+        self._pending = list()
+        super().__init__(path)
+
+    @staticmethod
+    def get_hash(word, response):
+        data = json.dumps([word, response], ensure_ascii=False, separators=(',', ':'), default=repr)
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def get(self, response_hash):
+        row = self._connection.execute(
+            'SELECT card FROM parsed_cards WHERE response_hash=? AND parser_version=?',
+            (response_hash, self.parser_version)
+        ).fetchone()
+        if row:
+            return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, response_hash, card):
+        card = zlib.compress(pickle.dumps(card, protocol=pickle.HIGHEST_PROTOCOL))
+        self._pending.append((response_hash, self.parser_version, card))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self._connection as connection:
+            connection.executemany('INSERT OR REPLACE INTO parsed_cards VALUES (?, ?, ?)', self._pending)
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+def encode_json_zlib(value):
+    data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+    compressor = zlib.compressobj(level=9, zdict=ZLIB_DICTIONARY)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode_json_zlib(blob):
+    decompressor = zlib.decompressobj(zdict=ZLIB_DICTIONARY)
+    return json.loads(decompressor.decompress(blob) + decompressor.flush())
+
+
+def encode(value, codec=JSON_ZLIB, prune=None):
+    if prune and value:
+        value = prune(value)
+    if codec == JSON_ZLIB:
+        try:
+            return JSON_ZLIB, encode_json_zlib(value)
+        except (TypeError, ValueError):
+            # e.g. pydantic cards of MicrosoftTranslator
+            pass
+    return PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode(codec, blob):
+    if codec == JSON_ZLIB:
+        return decode_json_zlib(blob)
+    return pickle.loads(blob)
+
+
+def get_shelve_path(cache_name):
+    return f'{get_dictionaries_path()}/{cache_name}'
+
+
+def get_sqlite_path(cache_name):
+    return f'{get_dictionaries_path()}/{cache_name}.sqlite3'
+
+
+def migrate_shelve(shelve_path, target: SqliteCache, batch_size=1000):
+    if not dbm.whichdb(shelve_path):
+        raise ValueError(f'{shelve_path} is missing or its dbm flavour is not available in this python')
+    source = ShelveCache(shelve_path, flag='r')
+    count = 0
+    try:
+        batch = list()
+        for word, value in source.items():
+            batch.append((word, value))
+            if len(batch) >= batch_size:
+                target.put_many(batch)
+                count += len(batch)
+                batch.clear()
+        target.put_many(batch)
+        count += len(batch)
+    finally:
+        source.close()
+    return count
+
+
+def shelve_exists(shelve_path):
+    # every dbm flavour names its files differently, a file that exists is not necessarily one whichdb can read
+    return any(os.path.exists(f'{shelve_path}{suffix}') for suffix in ('', '.db', '.dat', '.dir', '.pag'))
+
+
+def remove_sqlite(path):
+    for p in [path, f'{path}-wal', f'{path}-shm']:
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def open_cache(cache_name, translator, src='', dest='', backend='sqlite', prune=None) -> CacheBackend:
+    if backend == 'shelve':
+        return ShelveCache(get_shelve_path(cache_name))
+    elif backend != 'sqlite':
+        raise ValueError(f'Unknown cache backend: {backend}')
+    path = get_sqlite_path(cache_name)
+    shelve_path = get_shelve_path(cache_name)
+    is_new = not os.path.exists(path)
+    if is_new and shelve_exists(shelve_path) and not dbm.whichdb(shelve_path):
+        # an empty SQLite file would hide the shelve for good, every cached word would go back to the network
+        raise ValueError(f'Cannot import {shelve_path} into {path}: its dbm flavour is not available in this python, '
+                         f'run python -m translation_cache migrate where it is')
+    cache = SqliteCache(path, translator, src, dest, prune=prune)
+    if is_new and shelve_exists(shelve_path):
+        print(f'Importing {shelve_path} into {path}')
+        try:
+            print(f'Imported {migrate_shelve(shelve_path, cache)} entries')
+        except BaseException:
+            # the next open retries the import instead of finding a partial file
+            cache.close()
+            remove_sqlite(path)
+            raise
+    return cache
+
+
+def measure(values, prune=None):
+    # size and read latency of every codec against plain pickle, which is what shelve stores
+    values = list(values)
+    results = dict()
+    for name, codec, prune_ in [
+        ('shelve (pickle)', PICKLE, None),
+        ('json-zlib', JSON_ZLIB, None),
+        ('pruned json-zlib', JSON_ZLIB, prune),
+    ]:
+        if name.startswith('pruned') and not prune:
+            continue
+        blobs = [encode(value, codec, prune_) for value in values]
+        started = time.perf_counter()
+        for row in blobs:
+            decode(*row)
+        elapsed = time.perf_counter() - started
+        results[name] = dict(
+            bytes=sum(len(blob) for _, blob in blobs),
+            read_us_per_entry=round(1e6 * elapsed / max(len(blobs), 1), 1),
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Imports a shelve translation cache into SQLite')
+    parser.add_argument('command', choices=['migrate', 'measure', 'poison', 'unpoison'])
+    parser.add_argument('cache_name', help='e.g. portuguese for data/dictionaries/portuguese.db')
+    parser.add_argument('--translator', default='googletranslator')
+    parser.add_argument('--src', help='source language of the scope, e.g. pt for LANGUAGE in the config')
+    parser.add_argument('--dest', help='target language of the scope, main.py translates into en')
+    parser.add_argument('--words-file', help='poison/unpoison: one word per line, e.g. data/anki_failed_words.txt')
+    args = parser.parse_args()
+    if args.command != 'measure' and (args.src is None or args.dest is None):
+        # entries of any other scope are never read by CachingProxyTranslator
+        parser.error(f'{args.command} needs --src and --dest, e.g. --src pt --dest en')
+    if args.command in ('poison', 'unpoison'):
+        negative = NegativeCache(get_sqlite_path(args.cache_name), args.translator, args.src, args.dest)
+        try:
+            if args.words_file:
+                with open(args.words_file) as f:
+                    words = [word for word in (line.strip() for line in f) if word]
+                if args.command == 'poison':
+                    negative.poison(words)
+                else:
+                    negative.unpoison(words)
+            print('\n'.join(negative.poisoned()))
+        finally:
+            negative.close()
+        return
+    if args.command == 'measure':
+        from google import GoogleResponseParser
+        source = ShelveCache(get_shelve_path(args.cache_name), flag='r')
+        try:
+            results = measure((value for _, value in source.items()), prune=GoogleResponseParser.prune)
+        finally:
+            source.close()
+        print(json.dumps(results, indent=4))
+        return
+    shelve_path = get_shelve_path(args.cache_name)
+    if not dbm.whichdb(shelve_path):
+        sys.exit(f'{shelve_path} is missing or its dbm flavour is not available in this python')
+    target = SqliteCache(get_sqlite_path(args.cache_name), args.translator, args.src, args.dest)
+    try:
+        count = migrate_shelve(shelve_path, target)
+    finally:
+        target.close()
+    print(f'Imported {count} entries into {get_sqlite_path(args.cache_name)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+# the same words recur thousands of times across a namespace, responses and synonyms
+CACHE_SIZE = 100_000
+
+# letters the 'ru' pack of transliterate (~=1.10) maps, everything else passes through unchanged
+RU_PACK_LETTERS = frozenset("abvgdezijklmnoprstufhcC'y'ABVGDEZIJKLMNOPRSTUFH'Y'")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_russian(text):
+    # imported on first use, transliterate registers all its language packs on import
+    import transliterate
+    return transliterate.translit(text, 'ru')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def from_russian(text):
+    import transliterate
+    return transliterate.translit(text, 'ru', reversed=True)
+
+
+def is_russian(text):
+    # same as transliterate.translit(text, 'ru') == text, without building the transliteration
+    return RU_PACK_LETTERS.isdisjoint(text)
+
+
+def get_stats():
+    stats = dict()
+    for func in [to_russian, from_russian]:
+        info = func.cache_info()
+        calls = info.hits + info.misses
+        stats[func.__name__] = dict(info._asdict(), hit_rate=round(info.hits / calls, 3) if calls else None)
+    return stats
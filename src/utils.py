@@ -1,8 +1,8 @@
 import os
 import subprocess
 
-import nltk
-import transliterate
+from similarity import levenshtein, near_many
+from transliteration import to_russian, from_russian, is_russian
 
 
 def get_repo_path(repo_name='ankigen'):
@@ -13,34 +13,38 @@ def get_repo_path(repo_name='ankigen'):
 
 
 def get_distance(t1, t2):
-    return 100 * nltk.edit_distance(t1, t2) / max(min(len(t1), len(t2)), 1)
+    return 100 * levenshtein(t1, t2) / max(min(len(t1), len(t2)), 1)
 
 
 def get_distance_translit(eng, ru):
-    assert transliterate.translit(ru, 'ru') == ru, ru
-    eng_to_ru = transliterate.translit(eng, 'ru')
-    distance1 = nltk.edit_distance(eng_to_ru, ru) / len(min(eng_to_ru, ru))
+    assert is_russian(ru), ru
+    eng_to_ru = to_russian(eng)
+    distance1 = levenshtein(eng_to_ru, ru) / len(min(eng_to_ru, ru))
 
-    ru_to_eng = transliterate.translit(ru, 'ru', reversed=True)
-    distance2 = nltk.edit_distance(eng, ru_to_eng) / len(min(ru_to_eng, eng))
+    ru_to_eng = from_russian(ru)
+    distance2 = levenshtein(eng, ru_to_eng) / len(min(ru_to_eng, eng))
     return min(distance1, distance2)
 
 
 def remove_near_duplicates_within(words):
-    result = set(words)
-    for main_word in sorted(words, key=lambda w: (len(w), w)):
+    # Shortest words go first and drop every word containing their stem (all but the last letter).
+    # Each pass scans only the survivors, which stay in the order of first appearance.
+    result = dict.fromkeys(words)
+    for main_word in sorted(result, key=lambda w: (len(w), w)):
         if main_word not in result:
             # already removed
             continue
-        for secondary_word in list(result - {main_word}):
-            if main_word[:-1] in secondary_word:
-                result.remove(secondary_word)
-    return sorted(result, key=lambda word: words.index(word))
+        stem = main_word[:-1]
+        for secondary_word in [w for w in result if stem in w and w != main_word]:
+            del result[secondary_word]
+    return list(result)
 
 
 def get_near_duplicates(synonyms, word, threshold=40):
-    for synonym in synonyms:
-        if get_distance(synonym, word) <= threshold or contains(synonym, word):
+    # get_distance(synonym, word) <= threshold, most pairs are rejected by their lengths alone
+    synonyms = list(synonyms)
+    for synonym, near in zip(synonyms, near_many(word, synonyms, threshold)):
+        if near or contains(synonym, word):
             yield word
 
 
@@ -49,10 +53,13 @@ def contains(a, b):
 
 
 def get_near_duplicates_translit(ru_words, eng_word, threshold=40):
-    eng_to_ru = transliterate.translit(eng_word, 'ru')
-    for ru_word in ru_words:
-        ru_to_eng = transliterate.translit(ru_word, 'ru', reversed=True)
-        if min(get_distance(ru_word, eng_to_ru), get_distance(ru_to_eng, eng_word)) <= threshold:
+    eng_to_ru = to_russian(eng_word)
+    ru_words = list(ru_words)
+    ru_to_engs = [from_russian(ru_word) for ru_word in ru_words]
+    near_ru = near_many(eng_to_ru, ru_words, threshold)
+    near_eng = near_many(eng_word, ru_to_engs, threshold)
+    for ru_word, ru_to_eng, near1, near2 in zip(ru_words, ru_to_engs, near_ru, near_eng):
+        if near1 or near2:
             yield ru_word
         elif contains(eng_to_ru, ru_word) or contains(ru_to_eng, eng_word):
             yield ru_word
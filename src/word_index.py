@@ -0,0 +1,112 @@
+import hashlib
+import os
+import time
+from fnmatch import fnmatch
+
+from translation_cache import SqliteStore, SQLITE_BATCH, get_dictionaries_path
+from utils import chunker, get_repo_path
+
+
+class WordIndex(SqliteStore):
+    """
+    Persistent word -> namespaces index over data/namespaces/*/words.txt.
+    A namespace is re-read only when its words.txt changed (mtime and size, then content hash),
+    so excluding against many historical namespaces costs O(new words) instead of O(all words).
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS namespace_files (
+            namespace TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            sha1 TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS words (
+            word TEXT NOT NULL,
+            namespace TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            PRIMARY KEY (word, namespace)
+        ) WITHOUT ROWID;
+    '''
+
+    def __init__(self, path, namespaces_path):
+        self.namespaces_path = namespaces_path
+        super().__init__(path)
+
+    def _get_words_path(self, namespace):
+        return f'{self.namespaces_path}/{namespace}/words.txt'
+
+    def update(self, namespace):
+        # returns the number of words added to the namespace, 0 when words.txt did not change
+        path = self._get_words_path(namespace)
+        stat = os.stat(path)
+        row = self._connection.execute(
+            'SELECT mtime, size, sha1 FROM namespace_files WHERE namespace=?', (namespace,)
+        ).fetchone()
+        if row and row[:2] == (stat.st_mtime, stat.st_size):
+            return 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+        with self._connection as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO namespace_files VALUES (?, ?, ?, ?)',
+                (namespace, stat.st_mtime, stat.st_size, sha1)
+            )
+        if row and row[2] == sha1:
+            return 0
+        words = {word.strip() for word in data.decode().splitlines()}
+        words.discard('')
+        indexed = {word for word, in self._connection.execute(
+            'SELECT word FROM words WHERE namespace=?', (namespace,)
+        )}
+        added = words - indexed
+        removed = indexed - words
+        # the first indexing of a namespace dates its words by words.txt, later additions by now
+        first_seen = time.time() if row else stat.st_mtime
+        with self._connection as connection:
+            connection.executemany(
+                'INSERT INTO words VALUES (?, ?, ?)', [(word, namespace, first_seen) for word in added]
+            )
+            connection.executemany(
+                'DELETE FROM words WHERE word=? AND namespace=?', [(word, namespace) for word in removed]
+            )
+        return len(added)
+
+    def update_all(self, namespaces):
+        return {namespace: self.update(namespace) for namespace in namespaces}
+
+    def lookup(self, words, namespaces=None) -> dict:
+        # word -> namespaces it appears in, only for indexed words
+        result = dict()
+        namespaces = list(namespaces) if namespaces is not None else None
+        for chunk in chunker(list(dict.fromkeys(words)), SQLITE_BATCH):
+            query = f'SELECT word, namespace FROM words WHERE word IN ({",".join("?" * len(chunk))})'
+            if namespaces is not None:
+                query += f' AND namespace IN ({",".join("?" * len(namespaces))})'
+            for word, namespace in self._connection.execute(query, (*chunk, *(namespaces or []))):
+                result.setdefault(word, set()).add(namespace)
+        return result
+
+    def get_first_seen(self, word):
+        row = self._connection.execute('SELECT MIN(first_seen) FROM words WHERE word=?', (word,)).fetchone()
+        return row[0]
+
+    def count(self, namespace):
+        return self._connection.execute('SELECT COUNT(*) FROM words WHERE namespace=?', (namespace,)).fetchone()[0]
+
+
+def get_word_index_path():
+    return f'{get_dictionaries_path()}/word_index.sqlite3'
+
+
+def get_namespaces_path():
+    return f'{get_repo_path()}/data/namespaces'
+
+
+def find_namespaces(pattern='*'):
+    namespaces_path = get_namespaces_path()
+    return [
+        namespace for namespace in sorted(os.listdir(namespaces_path))
+        if fnmatch(namespace, pattern) and os.path.exists(f'{namespaces_path}/{namespace}/words.txt')
+    ]